@@ -2,17 +2,112 @@ import os
 import sys
 import re
 import csv
-from pathlib import Path
-from typing import Optional, List, Tuple, Dict, Any
+import hashlib
+import heapq
+import json
+import mmap
+import stat
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain, islice, repeat
+from operator import attrgetter, itemgetter
+from typing import Optional, List, Tuple, Dict, Any, Iterator
 from dataclasses import dataclass
 
-# Add the src directory to path to import scli modules  
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+import numpy as np
+
+# Add the src directory to path to import scli modules, unless the package is
+# already loaded (run through the scli script loader)
+if 'scli' not in sys.modules:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
 from scli.menu_utils import interactive_menu, text_input, confirm
 from scli.output_manager import OutputManager
 
 DESCRIPTION = "COBOL file processor - Process .cpy and .txt files to interpret data"
 
+# Directories never searched for copybooks or data files, along with any other hidden
+# (dot) directory; browse_directory_files tells the user they are skipped
+_IGNORED_DIRS = frozenset({
+    '.git', '.svn', '.hg', 'node_modules', '__pycache__', '.venv', 'venv',
+    '.tox', 'target', 'build', 'dist'
+})
+
+# Units for format_file_size, one per power of 1024
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB')
+
+# Parsed copybook cache: bump the version whenever the parser output changes.
+# SCLI_COPYBOOK_CACHE_DIR overrides its directory; an empty value turns it off.
+_COPYBOOK_CACHE_VERSION = 2
+_COPYBOOK_CACHE_MAX_ENTRIES = 64
+_COPYBOOK_CACHE_ENV = 'SCLI_COPYBOOK_CACHE_DIR'
+_COPYBOOK_CACHE_PREFIX = 'copybook-'
+
+# Buffer size for streaming reads and writes of large data files
+_IO_BUFFER_SIZE = 1 << 16
+
+# Sorted browser entries per (directory, extension, mtime, size), most recently used last
+_LISTING_CACHE = OrderedDict()
+_LISTING_CACHE_MAX = 64
+
+# Upper bound on threads used to scan directory subtrees
+_SCAN_MAX_WORKERS = 8
+
+# File browser item labels
+_DIR_ICON = '📁 '
+_FILE_ICON = '📄 '
+_FILE_DESCRIPTION = 'File (%s)'
+
+# Entries shown per page of the file browser
+_BROWSE_PAGE_SIZE = 500
+
+# Fixed file browser items, shared by every menu render
+_PARENT_ITEM = {
+    'name': '📁 ..',
+    'value': '..',
+    'description': 'Parent directory',
+    'type': 'parent'
+}
+_MORE_ITEM = {
+    'name': f'⏬ Load next {_BROWSE_PAGE_SIZE}…',
+    'value': 'more',
+    'description': 'Show more entries of this directory',
+    'type': 'more'
+}
+_TRAILING_ITEMS = (
+    {
+        'name': '✏️  Enter path manually',
+        'value': 'manual',
+        'description': 'Type the full file path',
+        'type': 'manual'
+    },
+    {
+        'name': '❌ Cancel',
+        'value': 'cancel',
+        'description': 'Cancel file selection',
+        'type': 'cancel'
+    }
+)
+
+# Browser listings with more matching files than this stat them in parallel
+_PARALLEL_STAT_THRESHOLD = 64
+
+# Thread pool for those stats, created on first use and shut down when the browse session ends
+_STAT_POOL = None
+_STAT_POOL_WORKERS = 32
+
+# PIC symbol classes, indexed by byte value (0 = not significant)
+_PIC_X, _PIC_9, _PIC_V, _PIC_REPEAT = 1, 2, 3, 4
+_PIC_ACTIONS = bytearray(256)
+_PIC_ACTIONS[ord('X')] = _PIC_X
+_PIC_ACTIONS[ord('9')] = _PIC_9
+_PIC_ACTIONS[ord('V')] = _PIC_V
+_PIC_ACTIONS[ord('(')] = _PIC_REPEAT
+
+# Precompiled patterns for copybook parsing
+_FIELD_RE = re.compile(r'\s*(\d{2})\s+([A-Z0-9-]+)(?:\s+REDEFINES\s+([A-Z0-9-]+))?(?:\s+PIC\s+([X9V()0-9]+))?\s*\.?', re.IGNORECASE)
+_NON_DIGIT_RE = re.compile(r'[^0-9]+')
+
 
 @dataclass
 class CobolField:
@@ -30,6 +125,152 @@ class CobolField:
             self.children = []
 
 
+@dataclass
+class Copybook:
+    """Parsed copybook: every field in definition order plus its elementary fields"""
+    all_fields: List[CobolField]
+    elementary_fields: List[CobolField] = None  # Fields with a PIC clause, computed once
+    
+    def __post_init__(self):
+        if self.elementary_fields is None:
+            self.elementary_fields = [f for f in self.all_fields if f.picture is not None]
+    
+    def __len__(self) -> int:
+        return len(self.all_fields)
+    
+    def __iter__(self) -> Iterator[CobolField]:
+        return iter(self.all_fields)
+
+
+@dataclass
+class RecordLayout:
+    """Elementary fields of one record type stored as parallel arrays.
+    
+    Built once per record type so record loops walk flat sequences instead of
+    CobolField objects, and the offset/length arrays describe the NumPy
+    structured dtype used by the batch parser without further filtering.
+    """
+    names: Tuple[str, ...]
+    start_positions: Tuple[int, ...]  # 1-based, as in the copybook
+    slices: Tuple[slice, ...]
+    decimals: Tuple[Optional[int], ...]  # None when no numeric formatting applies
+    offsets: np.ndarray  # 0-based start offsets
+    lengths: np.ndarray
+    
+    @classmethod
+    def from_fields(cls, fields: List[CobolField]) -> 'RecordLayout':
+        """Build the layout from elementary fields, deriving decimal places once"""
+        offsets = [field.start_pos - 1 for field in fields]  # Convert to 0-based
+        decimals = tuple(
+            _decimal_places(field.picture) if field.field_type == 'numeric' and 'V' in (field.picture or '') else None
+            for field in fields
+        )
+        return cls(
+            names=tuple(field.name for field in fields),
+            start_positions=tuple(field.start_pos for field in fields),
+            slices=tuple(slice(offset, offset + field.length) for offset, field in zip(offsets, fields)),
+            decimals=decimals,
+            offsets=np.array(offsets, dtype=np.int64),
+            lengths=np.array([field.length for field in fields], dtype=np.int64)
+        )
+    
+    def columns(self):
+        """Iterate (name, start_pos, slice, decimal_places) per field"""
+        return zip(self.names, self.start_positions, self.slices, self.decimals)
+
+
+class RecordTypeDetector:
+    """Record type detection with patterns and expected lengths computed once per copybook"""
+    
+    # Common COBOL pattern: first character indicates record type
+    TYPE_PATTERNS = {
+        '1': 'UGEC-CAB-RECAUDAC',  # Header record
+        '2': 'UGEC-DET-RECAUDAC',  # Detail record  
+        '9': 'UGEC-TOT-RECAUDAC'   # Total record
+    }
+    
+    def __init__(self, record_types: Dict[str, Any]):
+        # If only one record type exists, every line is that type (simple copybook case)
+        self.single_type = next(iter(record_types)) if len(record_types) == 1 else None
+        self.fallback_type = next(iter(record_types), "UNKNOWN")
+        self.patterns = {
+            first_char: record_type
+            for first_char, record_type in self.TYPE_PATTERNS.items()
+            if record_type in record_types
+        }
+        self.expected_lengths = [
+            (record_type, max((f.start_pos + f.length - 1) for f in fields))
+            for record_type, fields in record_types.items()
+            if fields
+        ]
+        # Fixed-width files repeat the same few line lengths, so length matches are memoized
+        self._by_length = {}
+    
+    def detect(self, line: str) -> str:
+        """Detect the type of a single record line"""
+        if not line:
+            return "UNKNOWN"
+        
+        if self.single_type is not None:
+            return self.single_type
+        
+        # If the first character matches a known record type, return it
+        detected_type = self.patterns.get(line[0])
+        if detected_type:
+            return detected_type
+        
+        line_length = len(line.rstrip())
+        detected_type = self._by_length.get(line_length)
+        if detected_type is None:
+            detected_type = self._by_length[line_length] = self._best_match_by_length(line_length)
+        return detected_type
+    
+    def _best_match_by_length(self, line_length: int) -> str:
+        """Record type whose expected length is closest to line_length"""
+        best_match = "UNKNOWN"
+        best_score = 0
+        
+        for record_type, max_pos in self.expected_lengths:
+            score = 1000 - abs(line_length - max_pos)  # Closer length = higher score
+            if score > best_score:
+                best_score = score
+                best_match = record_type
+        
+        return best_match if best_match != "UNKNOWN" else self.fallback_type
+
+
+@dataclass
+class BrowseListing:
+    """Sorted entries of one directory for the file browser, turned into menu items a page at a time"""
+    dir_entries: List[os.DirEntry]
+    file_entries: List[os.DirEntry]
+    parent: str  # Parent directory path; equal to the directory itself at the filesystem root
+    items: List[Dict[str, Any]] = None  # Menu items built so far: directories first, then files
+    dirs_built: int = 0
+    files_built: int = 0
+    
+    def __post_init__(self):
+        if self.items is None:
+            self.items = []
+    
+    def page(self, limit: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """The first `limit` menu items, and whether entries remain beyond them"""
+        if len(self.items) < limit and self.dirs_built < len(self.dir_entries):
+            end = min(len(self.dir_entries), self.dirs_built + limit - len(self.items))
+            self.items.extend(_build_dir_items(self.dir_entries[self.dirs_built:end]))
+            self.dirs_built = end
+        
+        # Files are stat'ed only when their page is shown; vanished files may leave a page short
+        while len(self.items) < limit and self.files_built < len(self.file_entries):
+            end = min(len(self.file_entries), self.files_built + limit - len(self.items))
+            self.items.extend(_build_file_items(self.file_entries[self.files_built:end]))
+            self.files_built = end
+        
+        has_more = len(self.items) > limit or self.dirs_built < len(self.dir_entries) \
+            or self.files_built < len(self.file_entries)
+        return self.items[:limit], has_more
+
+
 def main():
     print("🏢 COBOL File Processor")
     print("=" * 50)
@@ -95,25 +336,27 @@ def select_and_process_files():
     
     # Get .cpy file path with browser
     print("\n📄 Select .cpy file:")
-    cpy_file = browse_for_file('.cpy', "Select COBOL copybook file (.cpy)")
-    if not cpy_file:
+    cpy_selection = _browse_for_file_with_stat('.cpy', "Select COBOL copybook file (.cpy)")
+    if not cpy_selection:
         print("❌ CPY file selection cancelled")
         return
+    cpy_file, cpy_stat = cpy_selection
     print(f"✅ CPY file selected: {cpy_file}")
     
     # Get .txt file path with browser
     print("\n📄 Select .txt file:")
     # Start browsing from the same directory as the .cpy file
     start_dir = os.path.dirname(cpy_file) if cpy_file else None
-    txt_file = browse_for_file('.txt', "Select data file (.txt)", start_dir)
-    if not txt_file:
+    txt_selection = _browse_for_file_with_stat('.txt', "Select data file (.txt)", start_dir)
+    if not txt_selection:
         print("❌ TXT file selection cancelled")
         return
+    txt_file, txt_stat = txt_selection
     print(f"✅ TXT file selected: {txt_file}")
     
     # Process the selected files
     if cpy_file and txt_file:
-        process_files(cpy_file, txt_file)
+        process_files(cpy_file, txt_file, cpy_stat, txt_stat)
 
 
 def browse_directory_files():
@@ -138,6 +381,7 @@ def browse_directory_files():
         return
     
     # Scan for files
+    print("🔍 Skipping hidden, VCS, dependency and build directories")
     cpy_files, txt_files = scan_directory_for_files(directory)
     
     if not cpy_files and not txt_files:
@@ -151,30 +395,10 @@ def browse_directory_files():
         print(f"  📄 .txt files: {len(txt_files)}")
     
     # Select .cpy file
-    cpy_file = None
-    if cpy_files:
-        if len(cpy_files) == 1:
-            cpy_file = cpy_files[0]
-            print(f"✅ Auto-selected CPY file: {os.path.basename(cpy_file)}")
-        else:
-            cpy_choices = [{'name': os.path.basename(f), 'value': f, 'description': f} for f in cpy_files]
-            selected_cpy = interactive_menu("Select a .cpy file:", cpy_choices)
-            if selected_cpy:
-                cpy_file = selected_cpy['value']
-                print(f"✅ Selected CPY file: {os.path.basename(cpy_file)}")
+    cpy_file = _select_found_file(cpy_files, 'cpy') if cpy_files else None
     
     # Select .txt file  
-    txt_file = None
-    if txt_files:
-        if len(txt_files) == 1:
-            txt_file = txt_files[0]
-            print(f"✅ Auto-selected TXT file: {os.path.basename(txt_file)}")
-        else:
-            txt_choices = [{'name': os.path.basename(f), 'value': f, 'description': f} for f in txt_files]
-            selected_txt = interactive_menu("Select a .txt file:", txt_choices)
-            if selected_txt:
-                txt_file = selected_txt['value']
-                print(f"✅ Selected TXT file: {os.path.basename(txt_file)}")
+    txt_file = _select_found_file(txt_files, 'txt') if txt_files else None
     
     # Process files if both are selected
     if cpy_file and txt_file:
@@ -187,22 +411,91 @@ def browse_directory_files():
         print("❌ Both .cpy and .txt files are required for processing")
 
 
+def _basename_fast(path: str) -> str:
+    """Final path component via a single rfind (os.path.basename on platforms with an altsep)"""
+    if os.altsep:
+        return os.path.basename(path)
+    
+    i = path.rfind(os.sep)
+    return path[i + 1:] if i >= 0 else path
+
+
+def _select_found_file(file_paths: List[str], kind: str) -> Optional[str]:
+    """Pick one of the scanned files, auto-selecting when only one was found"""
+    if len(file_paths) == 1:
+        print(f"✅ Auto-selected {kind.upper()} file: {_basename_fast(file_paths[0])}")
+        return file_paths[0]
+    
+    # Basenames are computed once; the chosen entry's name is reused below
+    choices = [{'name': _basename_fast(f), 'value': f, 'description': f} for f in file_paths]
+    selected = interactive_menu(f"Select a .{kind} file:", choices)
+    if not selected:
+        return None
+    
+    print(f"✅ Selected {kind.upper()} file: {selected['name']}")
+    return selected['value']
+
+
+def _list_cobol_directory(directory: str) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """List a single directory: ('cpy' | 'txt', path) pairs plus its subdirectories"""
+    found = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir():
+                    # Symlinked directories are neither followed nor listed, as with os.walk;
+                    # hidden, VCS, dependency and build trees are not descended into
+                    name = entry.name
+                    if not entry.is_symlink() and name not in _IGNORED_DIRS and not name.startswith('.'):
+                        subdirs.append(entry.path)
+                    continue
+                
+                # Lowercase only the 4-character suffix, not the whole name
+                suffix = entry.name[-4:].lower()
+                if suffix == '.cpy':
+                    found.append(('cpy', entry.path))
+                elif suffix == '.txt':
+                    found.append(('txt', entry.path))
+    except OSError as e:
+        # Unreadable directories are reported, then skipped
+        print(f"❌ Error scanning directory: {e}")
+    
+    return found, subdirs
+
+
+def iter_cobol_files(directory: str) -> Iterator[Tuple[str, str]]:
+    """Lazily yield ('cpy' | 'txt', path) pairs for files found under directory"""
+    stack = [directory]
+    
+    while stack:
+        found, subdirs = _list_cobol_directory(stack.pop())
+        stack.extend(subdirs)
+        yield from found
+
+
+def _collect_cobol_files(directory: str) -> List[Tuple[str, str]]:
+    """Walk one subtree to completion (thread pool worker)"""
+    return list(iter_cobol_files(directory))
+
+
 def scan_directory_for_files(directory: str) -> Tuple[List[str], List[str]]:
     """Scan directory for .cpy and .txt files"""
     cpy_files = []
     txt_files = []
     
-    try:
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                file_path = os.path.join(root, file)
-                if file.lower().endswith('.cpy'):
-                    cpy_files.append(file_path)
-                elif file.lower().endswith('.txt'):
-                    txt_files.append(file_path)
-    except Exception as e:
-        print(f"❌ Error scanning directory: {e}")
+    # Walking is dominated by directory reads, which release the GIL, so each
+    # top-level subtree is scanned in its own thread
+    found, subdirs = _list_cobol_directory(directory)
+    if len(subdirs) < 2:
+        subtree_results = [_collect_cobol_files(subdir) for subdir in subdirs]
+    else:
+        with ThreadPoolExecutor(max_workers=min(_SCAN_MAX_WORKERS, len(subdirs))) as executor:
+            subtree_results = list(executor.map(_collect_cobol_files, subdirs))
     
+    for kind, path in chain(found, chain.from_iterable(subtree_results)):
+        (cpy_files if kind == 'cpy' else txt_files).append(path)
+
     # Sort files for consistent ordering
     cpy_files.sort()
     txt_files.sort()
@@ -210,25 +503,36 @@ def scan_directory_for_files(directory: str) -> Tuple[List[str], List[str]]:
     return cpy_files, txt_files
 
 
-def validate_file_path(file_path: str, expected_extension: str) -> bool:
-    """Validate file path exists and has correct extension"""
-    if not os.path.exists(file_path):
+def validate_file_path(file_path: str, expected_extension: str) -> Optional[os.stat_result]:
+    """Validate file path exists and has correct extension.
+    
+    Returns the file's stat result so callers can reuse it, or None if invalid.
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
         print(f"❌ File does not exist: {file_path}")
-        return False
+        return None
         
-    if not os.path.isfile(file_path):
+    if not stat.S_ISREG(file_stat.st_mode):
         print(f"❌ Path is not a file: {file_path}")
-        return False
+        return None
         
-    if not file_path.lower().endswith(expected_extension.lower()):
+    if not _has_extension(file_path, expected_extension):
         print(f"❌ File does not have {expected_extension} extension: {file_path}")
-        return False
+        return None
         
-    return True
+    return file_stat
+
+
+def _has_extension(file_name: str, extension: str) -> bool:
+    """Case-insensitive extension check that lowercases only the suffix"""
+    return file_name[-len(extension):].lower() == extension.lower()
 
 
-def process_files(cpy_file: str, txt_file: str):
-    """Process the selected .cpy and .txt files"""
+def process_files(cpy_file: str, txt_file: str,
+                  cpy_stat: Optional[os.stat_result] = None, txt_stat: Optional[os.stat_result] = None):
+    """Process the selected .cpy and .txt files, reusing stat results when the caller has them"""
     print(f"\n🔄 Processing Files")
     print("=" * 30)
     
@@ -242,8 +546,8 @@ def process_files(cpy_file: str, txt_file: str):
     
     # Get file sizes
     try:
-        cpy_size = os.path.getsize(cpy_file)
-        txt_size = os.path.getsize(txt_file)
+        cpy_size = (cpy_stat or os.stat(cpy_file)).st_size
+        txt_size = (txt_stat or os.stat(txt_file)).st_size
         
         print(f"\n📊 File Information:")
         print(f"  • CPY File Size: {format_file_size(cpy_size)}")
@@ -253,20 +557,20 @@ def process_files(cpy_file: str, txt_file: str):
         
         # Parse COBOL copybook structure
         print(f"\n🔍 Parsing COBOL copybook structure...")
-        fields = parse_cobol_copybook(cpy_file)
+        copybook = parse_cobol_copybook(cpy_file)
         
-        if fields:
-            print(f"📋 Found {len(fields)} field definitions:")
-            display_cobol_structure(fields)
+        if copybook:
+            print(f"📋 Found {len(copybook)} field definitions:")
+            display_cobol_structure(copybook.all_fields)
             
             # Parse data file using the structure
             if confirm("\nWould you like to parse the data file using this structure?", default=True):
                 print(f"\n🔄 Parsing data file...")
-                parsed_records = parse_data_file(txt_file, fields)
+                parsed_records = parse_data_file(txt_file, copybook)
                 
                 # Offer CSV export
                 if parsed_records and confirm("\nWould you like to export the data to CSV?", default=True):
-                    export_to_csv(parsed_records, fields, txt_file)
+                    export_to_csv(parsed_records, copybook, txt_file)
         else:
             print("❌ Could not parse COBOL copybook structure")
         
@@ -276,119 +580,72 @@ def process_files(cpy_file: str, txt_file: str):
 
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
-    if size_bytes == 0:
+    if size_bytes <= 0:
         return "0 B"
     
-    size_units = ['B', 'KB', 'MB', 'GB']
-    unit_index = 0
-    size = float(size_bytes)
+    # Each unit spans 10 bits, so the bit length picks the unit without a loop
+    unit_index = min((size_bytes.bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    if unit_index == 0:
+        return f"{size_bytes} {_SIZE_UNITS[0]}"
     
-    while size >= 1024 and unit_index < len(size_units) - 1:
-        size /= 1024
-        unit_index += 1
+    return f"{size_bytes / (1 << (unit_index * 10)):.1f} {_SIZE_UNITS[unit_index]}"
+
+
+def _format_file_sizes(sizes: List[int]) -> List[str]:
+    """Vectorized format_file_size for a list of byte counts"""
+    if not sizes:
+        return []
     
-    if unit_index == 0:
-        return f"{int(size)} {size_units[unit_index]}"
-    else:
-        return f"{size:.1f} {size_units[unit_index]}"
+    values = np.array(sizes, dtype=np.int64)
+    # Unit index from exact integer thresholds (log2 would round near powers of two)
+    unit_index = sum((values >= (1 << (10 * i))).astype(np.int64) for i in range(1, len(_SIZE_UNITS)))
+    scaled = np.char.mod('%.1f', np.ldexp(values.astype(np.float64), -10 * unit_index))
+    numbers = np.where(unit_index == 0, values.astype(str), scaled)
+    units = np.array(_SIZE_UNITS)[unit_index]
+    formatted = np.char.add(np.char.add(numbers, ' '), units).tolist()
+    # format_file_size reports zero and negative sizes as "0 B"
+    return [text if size > 0 else "0 B" for text, size in zip(formatted, sizes)]
 
 
-def parse_cobol_copybook(cpy_file: str) -> List[CobolField]:
+def parse_cobol_copybook(cpy_file: str) -> Copybook:
     """Parse COBOL copybook and extract field definitions with REDEFINES support"""
-    fields = []
-    current_position = 1
-    current_group_start = 1  # Track where current level 02 group starts
-    redefines_groups = {}  # Track REDEFINES relationships
+    cache_dir = _copybook_cache_dir()
+    cache_key = _copybook_cache_key(cpy_file) if cache_dir else None
+    cached = _load_cached_copybook(cache_dir, cache_key) if cache_key else None
     
-    try:
-        with open(cpy_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+    if cached is not None:
+        fields, redefines_groups = cached
+    else:
+        try:
+            fields, redefines_groups = _read_copybook_fields(cpy_file)
+        except Exception as e:
+            print(f"❌ Error parsing COBOL copybook: {e}")
+            return Copybook([])
         
-        for line in lines:
-            line = line.strip()
-            
-            # Skip comments and empty lines
-            if not line or line.startswith('*') or line.startswith('      *'):
-                continue
-            
-            # Look for field definitions with optional REDEFINES clause
-            field_match = re.match(r'\s*(\d{2})\s+([A-Z0-9-]+)(?:\s+REDEFINES\s+([A-Z0-9-]+))?(?:\s+PIC\s+([X9V()0-9]+))?\s*\.?', line, re.IGNORECASE)
-            
-            if field_match:
-                level = int(field_match.group(1))
-                name = field_match.group(2)
-                redefines_target = field_match.group(3)
-                picture = field_match.group(4)
-                
-                # Determine starting position for this field
-                field_start_pos = current_position
-                
-                # Handle different level types
-                if level == 2:  # Level 02 - main record structures
-                    if redefines_target:
-                        # REDEFINES: Start at position 1 (redefining the first structure)
-                        field_start_pos = 1
-                        current_group_start = 1
-                        current_position = 1
-                        redefines_groups[name] = redefines_target
-                        print(f"🔄 REDEFINES detected: {name} redefines {redefines_target} at position 1")
-                    else:
-                        # First/main structure: starts at position 1
-                        field_start_pos = 1
-                        current_group_start = 1
-                        current_position = 1
-                elif level >= 5:  # Child fields (05, 10, etc.)
-                    # Child fields continue from current position within the group
-                    field_start_pos = current_position
-                
-                # Create the field object
-                if picture:
-                    # Elementary field with PIC clause
-                    field_length, field_type = parse_picture_clause(picture)
-                    field = CobolField(
-                        level=level,
-                        name=name,
-                        picture=picture,
-                        start_pos=field_start_pos,
-                        length=field_length,
-                        field_type=field_type
-                    )
-                    fields.append(field)
-                    
-                    # Advance position only for elementary fields
-                    if level >= 5:
-                        current_position += field_length
-                else:
-                    # Group field (no PIC clause)
-                    field = CobolField(
-                        level=level,
-                        name=name,
-                        picture=None,
-                        start_pos=field_start_pos,
-                        length=0,  # Will be calculated based on children
-                        field_type='group'
-                    )
-                    fields.append(field)
+        if cache_key:
+            _store_cached_copybook(cache_dir, cache_key, fields, redefines_groups)
     
-    except Exception as e:
-        print(f"❌ Error parsing COBOL copybook: {e}")
-        return []
+    # Diagnostics are collected here and written once, outside the parsing loop
+    out = [
+        f"🔄 REDEFINES detected: {name} redefines {redefines_target} at position 1"
+        for name, redefines_target in redefines_groups.items()
+    ]
     
     # Post-process: Calculate group lengths and show REDEFINES relationships
     if redefines_groups:
-        print(f"\n📋 REDEFINES relationships found:")
+        out.append(f"\n📋 REDEFINES relationships found:")
         for redefining, redefined in redefines_groups.items():
-            print(f"  • {redefining} REDEFINES {redefined}")
+            out.append(f"  • {redefining} REDEFINES {redefined}")
     
     # Calculate total lengths for each group
-    print(f"\n📏 Structure lengths:")
+    out.append(f"\n📏 Structure lengths:")
     current_group = None
     group_max_pos = 0
     
     for field in fields:
         if field.level == 2:
             if current_group:
-                print(f"  • {current_group}: {group_max_pos} bytes")
+                out.append(f"  • {current_group}: {group_max_pos} bytes")
             current_group = field.name
             group_max_pos = 0
         elif field.picture and field.length > 0:
@@ -396,9 +653,172 @@ def parse_cobol_copybook(cpy_file: str) -> List[CobolField]:
             group_max_pos = max(group_max_pos, field_end)
     
     if current_group:
-        print(f"  • {current_group}: {group_max_pos} bytes")
+        out.append(f"  • {current_group}: {group_max_pos} bytes")
+    
+    sys.stdout.write('\n'.join(out) + '\n')
+    return Copybook(fields)
+
+
+def _read_copybook_fields(cpy_file: str) -> Tuple[List[CobolField], Dict[str, str]]:
+    """Read field definitions from a copybook, returning (fields, REDEFINES relationships)"""
+    fields = []
+    current_position = 1
+    current_group_start = 1  # Track where current level 02 group starts
+    redefines_groups = {}  # Track REDEFINES relationships
+    
+    # Copybooks are single-byte text; latin-1 decodes any byte without UTF-8 validation
+    with open(cpy_file, 'r', encoding='latin-1', newline='') as f:
+        # One bulk read and a C-level split; newline characters never reach the loop
+        lines = f.read().splitlines()
+    
+    for line in lines:
+        line = line.strip()
+        
+        # Skip comments and empty lines
+        if not line or line.startswith('*') or line.startswith('      *'):
+            continue
+        
+        # Field definitions start with a two-digit level number; skip the regex otherwise
+        if len(line) < 4 or not line[:2].isdigit():
+            continue
+        
+        # Look for field definitions with optional REDEFINES clause
+        field_match = _FIELD_RE.match(line)
+        
+        if field_match:
+            level = int(field_match.group(1))
+            name = field_match.group(2)
+            redefines_target = field_match.group(3)
+            picture = field_match.group(4)
+            
+            # Determine starting position for this field
+            field_start_pos = current_position
+            
+            # Handle different level types
+            if level == 2:  # Level 02 - main record structures
+                if redefines_target:
+                    # REDEFINES: Start at position 1 (redefining the first structure)
+                    field_start_pos = 1
+                    current_group_start = 1
+                    current_position = 1
+                    redefines_groups[name] = redefines_target
+                else:
+                    # First/main structure: starts at position 1
+                    field_start_pos = 1
+                    current_group_start = 1
+                    current_position = 1
+            elif level >= 5:  # Child fields (05, 10, etc.)
+                # Child fields continue from current position within the group
+                field_start_pos = current_position
+            
+            # Create the field object
+            if picture:
+                # Elementary field with PIC clause
+                field_length, field_type = parse_picture_clause(picture)
+                field = CobolField(
+                    level=level,
+                    name=name,
+                    picture=picture,
+                    start_pos=field_start_pos,
+                    length=field_length,
+                    field_type=field_type
+                )
+                fields.append(field)
+                
+                # Advance position only for elementary fields
+                if level >= 5:
+                    current_position += field_length
+            else:
+                # Group field (no PIC clause)
+                field = CobolField(
+                    level=level,
+                    name=name,
+                    picture=None,
+                    start_pos=field_start_pos,
+                    length=0,  # Will be calculated based on children
+                    field_type='group'
+                )
+                fields.append(field)
+
+    return fields, redefines_groups
+
+
+def _copybook_cache_dir() -> Optional[str]:
+    """Directory holding cached copybook layouts, or None when the cache is turned off"""
+    cache_dir = os.environ.get(_COPYBOOK_CACHE_ENV)
+    if cache_dir is not None:
+        return cache_dir or None
+    
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'scli', 'copybooks')
+
+
+def _copybook_cache_key(cpy_file: str) -> Optional[str]:
+    """Cache file name for a copybook; any change to its path, mtime or size gives a new key"""
+    try:
+        real_path = os.path.realpath(cpy_file)
+        st = os.stat(real_path)
+    except OSError:
+        return None
+    
+    key = (_COPYBOOK_CACHE_VERSION, real_path, st.st_mtime_ns, st.st_size)
+    return _COPYBOOK_CACHE_PREFIX + hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.json'
+
+
+def _load_cached_copybook(cache_dir: str, cache_key: str) -> Optional[Tuple[List[CobolField], Dict[str, str]]]:
+    """Load a cached (fields, redefines_groups) pair, or None on a miss or unreadable entry"""
+    cache_file = os.path.join(cache_dir, cache_key)
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+        if document['version'] != _COPYBOOK_CACHE_VERSION:
+            return None
+        fields = [CobolField(*row) for row in document['fields']]
+        redefines_groups = dict(document['redefines'])
+        # Refresh the mtime so eviction drops the least recently used entries
+        os.utime(cache_file)
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
     
-    return fields
+    return fields, redefines_groups
+
+
+def _store_cached_copybook(cache_dir: str, cache_key: str, fields: List[CobolField], redefines_groups: Dict[str, str]):
+    """Atomically write a parsed copybook to the cache, keeping it bounded in size"""
+    # Plain JSON rows: loading the cache never runs code, whatever ends up in the directory
+    document = {
+        'version': _COPYBOOK_CACHE_VERSION,
+        'fields': [
+            [field.level, field.name, field.picture, field.start_pos, field.length, field.field_type]
+            for field in fields
+        ],
+        'redefines': redefines_groups
+    }
+    cache_file = os.path.join(cache_dir, cache_key)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(document, f)
+        os.replace(tmp_file, cache_file)
+        
+        # Only this cache's own files are counted and evicted, wherever the directory points
+        with os.scandir(cache_dir) as it:
+            entries = [
+                entry for entry in it
+                if entry.name.startswith(_COPYBOOK_CACHE_PREFIX) and entry.name.endswith('.json')
+            ]
+        if len(entries) > _COPYBOOK_CACHE_MAX_ENTRIES:
+            entries.sort(key=lambda entry: entry.stat().st_mtime_ns)
+            for entry in entries[:len(entries) - _COPYBOOK_CACHE_MAX_ENTRIES]:
+                os.remove(entry.path)
+    except OSError:
+        # The cache is only an optimization
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
 
 
 def parse_picture_clause(picture: str) -> Tuple[int, str]:
@@ -406,45 +826,56 @@ def parse_picture_clause(picture: str) -> Tuple[int, str]:
     if not picture:
         return 0, 'group'
     
+    length, field_type, _ = _scan_picture(picture)
+    return length, field_type
+
+
+@lru_cache(maxsize=1024)
+def _scan_picture(picture: str) -> Tuple[int, str, int]:
+    """Single left-to-right pass over a PIC clause.
+    
+    Returns (length, field_type, decimal_places). Each X or 9 symbol counts
+    one position, or n positions when followed by a repeat count "(n)", and
+    9 symbols after the implied decimal point V count as decimal places.
+    """
+    pic = picture.upper().strip()
     # Remove common COBOL keywords
-    pic = picture.upper().replace('PIC', '').replace('PICTURE', '').strip()
+    if pic.startswith('PICTURE'):
+        pic = pic[7:].lstrip()
+    elif pic.startswith('PIC'):
+        pic = pic[3:].lstrip()
     
     length = 0
-    field_type = 'alphanumeric'
-    
-    # Handle different PIC formats
-    if 'X' in pic:
-        # Alphanumeric field
-        field_type = 'alphanumeric'
-        # Extract length: X(30) or XXX
-        x_match = re.search(r'X\((\d+)\)', pic)
-        if x_match:
-            length = int(x_match.group(1))
-        else:
-            length = pic.count('X')
-    
-    elif '9' in pic:
-        # Numeric field
-        field_type = 'numeric'
-        # Extract length: 9(10) or 999V99
-        nine_match = re.search(r'9\((\d+)\)', pic)
-        if nine_match:
-            length = int(nine_match.group(1))
-        else:
-            length = pic.count('9')
-        
-        # Add decimal places if V is present
-        if 'V' in pic:
-            v_pos = pic.find('V')
-            decimal_part = pic[v_pos+1:]
-            if '(' in decimal_part:
-                decimal_match = re.search(r'\((\d+)\)', decimal_part)
-                if decimal_match:
-                    length += int(decimal_match.group(1))
+    decimal_places = 0
+    has_x = has_nine = after_v = False
+    # Classify symbols through the byte lookup table instead of string comparisons
+    data = pic.encode('ascii', 'replace')
+    i = 0
+    end = len(data)
+    
+    while i < end:
+        action = _PIC_ACTIONS[data[i]]
+        if action == _PIC_X or action == _PIC_9:
+            count = 1
+            # Repeat count: X(30), 9(10)
+            if i + 1 < end and _PIC_ACTIONS[data[i + 1]] == _PIC_REPEAT:
+                close = data.find(b')', i + 2)
+                if close > i + 2 and data[i + 2:close].isdigit():
+                    count = int(data[i + 2:close])
+                    i = close
+            length += count
+            if action == _PIC_X:
+                has_x = True
             else:
-                length += decimal_part.count('9')
+                has_nine = True
+                if after_v:
+                    decimal_places += count
+        elif action == _PIC_V:
+            after_v = True
+        i += 1
     
-    return length, field_type
+    field_type = 'numeric' if has_nine and not has_x else 'alphanumeric'
+    return length, field_type, decimal_places
 
 
 def display_cobol_structure(fields: List[CobolField]):
@@ -461,34 +892,43 @@ def display_cobol_structure(fields: List[CobolField]):
         print(f"{indent}{field.level:02d} {field.name}{pic_info}{length_info}{pos_info}")
 
 
-def parse_data_file(txt_file: str, fields: List[CobolField]):
+def parse_data_file(txt_file: str, copybook: Copybook):
     """Parse fixed-width data file using COBOL field definitions"""
     try:
         # Try different encodings commonly used in COBOL systems
         encodings_to_try = ['utf-8', 'latin-1', 'cp1252', 'ascii']
-        lines = None
+        sample_lines = None
         used_encoding = None
+        total_lines = 0
+        total_records = 0
         
         for encoding in encodings_to_try:
             try:
-                with open(txt_file, 'r', encoding=encoding) as f:
-                    lines = f.readlines()
-                    used_encoding = encoding
-                    break
+                # Stream the file: keep the first 10 lines as samples and only count the rest
+                with open(txt_file, 'r', encoding=encoding, buffering=_IO_BUFFER_SIZE) as f:
+                    sample_lines = list(islice(f, 10))
+                    total_lines = len(sample_lines)
+                    total_records = sum(1 for line in sample_lines if line.strip())
+                    for line in f:
+                        total_lines += 1
+                        if line.strip():
+                            total_records += 1
+                used_encoding = encoding
+                break
             except UnicodeDecodeError:
                 continue
         
-        if lines is None:
+        if used_encoding is None:
             print("❌ Could not decode file with any supported encoding")
             return
             
         print(f"📖 File decoded using: {used_encoding}")
         
-        if not lines:
+        if not total_lines:
             print("❌ Data file is empty")
             return
         
-        print(f"\n📊 Analyzing {len(lines)} data records...")
+        print(f"\n📊 Analyzing {total_lines} data records...")
         print("-" * 60)
         
         # Group fields by record type (level 01/02 groups or single structure)
@@ -496,7 +936,7 @@ def parse_data_file(txt_file: str, fields: List[CobolField]):
         current_group = None
         
         # Look for level 01 or 02 groups
-        for field in fields:
+        for field in copybook.all_fields:
             if field.level in [1, 2]:  # New record type (level 01 or 02)
                 current_group = field.name
                 record_types[current_group] = []
@@ -505,9 +945,8 @@ def parse_data_file(txt_file: str, fields: List[CobolField]):
         
         # If no groups found, create a single default group
         if not record_types:
-            elementary_fields = [f for f in fields if f.picture is not None]
-            if elementary_fields:
-                record_types['DEFAULT_RECORD'] = elementary_fields
+            if copybook.elementary_fields:
+                record_types['DEFAULT_RECORD'] = copybook.elementary_fields
         
         print(f"📋 Found {len(record_types)} record types:")
         for record_type in record_types.keys():
@@ -516,55 +955,60 @@ def parse_data_file(txt_file: str, fields: List[CobolField]):
         # Parse records and detect type by first character or pattern
         records_by_type = {}
         
-        for i, line in enumerate(lines[:10]):  # Analyze first 10 records
-            line = line.rstrip('\n\r')
+        detector = RecordTypeDetector(record_types)
+        for i, line in enumerate(sample_lines):  # Analyze first 10 records
+            # Universal newlines leave at most one trailing '\n'
+            line = line[:-1] if line[-1:] == '\n' else line
             if not line:
                 continue
                 
             # Try to determine record type
-            record_type = detect_record_type(line, record_types)
+            record_type = detector.detect(line)
             
             if record_type not in records_by_type:
                 records_by_type[record_type] = []
             records_by_type[record_type].append((i+1, line))
         
-        # Show samples of each record type
+        # Show samples of each record type, buffered into a single stdout write
+        out = []
         for record_type, records in records_by_type.items():
             if not records:
                 continue
                 
-            print(f"\n🔍 {record_type} Records (showing first 2):")
-            print("-" * 50)
+            out.append(f"\n🔍 {record_type} Records (showing first 2):")
+            out.append("-" * 50)
             
             field_list = record_types.get(record_type, [])
+            layout = RecordLayout.from_fields(field_list[:10])  # Show first 10 fields
             
             for record_num, line in records[:2]:
-                print(f"\n📄 Record #{record_num}:")
+                out.append(f"\n📄 Record #{record_num}:")
                 
-                for field in field_list[:10]:  # Show first 10 fields
-                    if field.start_pos <= len(line):
-                        start_pos = field.start_pos - 1  # Convert to 0-based
-                        end_pos = start_pos + field.length
-                        field_value = line[start_pos:end_pos].strip()
+                line_length = len(line)
+                for name, start_pos, field_slice, decimals in layout.columns():
+                    if start_pos <= line_length:
+                        field_value = line[field_slice].strip()
                         
                         # Format numeric fields with decimals
-                        if field.field_type == 'numeric' and 'V' in (field.picture or ''):
-                            field_value = format_numeric_field(field_value, field.picture)
+                        if decimals is not None:
+                            field_value = _format_decimal_value(field_value, decimals)
                         
-                        print(f"  {field.name}: '{field_value}'")
+                        out.append(f"  {name}: '{field_value}'")
                 
                 if len(field_list) > 10:
-                    print(f"  ... and {len(field_list) - 10} more fields")
+                    out.append(f"  ... and {len(field_list) - 10} more fields")
+        
+        if out:
+            sys.stdout.write('\n'.join(out) + '\n')
         
-        total_records = len([line for line in lines if line.strip()])
         print(f"\n✅ Successfully analyzed {total_records} records!")
         
         # Return parsed data for CSV export
         return {
             'records_by_type': records_by_type,
             'record_types': record_types,
-            'all_lines': lines,
-            'encoding': used_encoding
+            'encoding': used_encoding,
+            'total_lines': total_lines
         }
         
     except Exception as e:
@@ -574,76 +1018,209 @@ def parse_data_file(txt_file: str, fields: List[CobolField]):
 
 def detect_record_type(line: str, record_types: Dict[str, Any]) -> str:
     """Detect the type of record based on the first character or pattern"""
-    if not line:
-        return "UNKNOWN"
+    return RecordTypeDetector(record_types).detect(line)
+
+
+def format_numeric_field(value: str, picture: str) -> str:
+    """Format a numeric field value according to its PICTURE clause"""
+    if not value or not picture:
+        return value
     
-    # If only one record type exists, return it (simple copybook case)
-    if len(record_types) == 1:
-        return list(record_types.keys())[0]
+    return _format_decimal_value(value, _decimal_places(picture))
+
+
+def _decimal_places(picture: str) -> int:
+    """Number of implied decimal places after the V in a PICTURE clause"""
+    if 'V' not in picture:
+        return 0
     
-    # Common COBOL pattern: first character indicates record type
-    first_char = line[0] if line else ""
+    return _scan_picture(picture)[2]
+
+
+def _format_decimal_value(value: str, decimal_places: int) -> str:
+    """Format a numeric field value with a precomputed number of decimal places"""
+    if not value:
+        return value
     
-    # Map common patterns to record types
-    type_patterns = {
-        '1': 'UGEC-CAB-RECAUDAC',  # Header record
-        '2': 'UGEC-DET-RECAUDAC',  # Detail record  
-        '9': 'UGEC-TOT-RECAUDAC'   # Total record
-    }
+    # Remove non-numeric characters for processing
+    clean_value = value if value.isascii() and value.isdigit() else _NON_DIGIT_RE.sub('', value)
+    if not clean_value:
+        return value
     
-    detected_type = type_patterns.get(first_char)
+    if decimal_places > 0:
+        # Integer split keeps the implied decimal point exact (no float rounding)
+        whole, frac = divmod(int(clean_value), 10 ** decimal_places)
+        return f"{whole}.{frac:0{decimal_places}d}"
     
-    # If pattern matches a known record type, return it
-    if detected_type and detected_type in record_types:
-        return detected_type
+    return clean_value
+
+
+def _batch_parse_fixed_width(txt_file: str, layouts: Dict[str, RecordLayout],
+                             detector: RecordTypeDetector) -> Optional[List[Tuple[str, List[int], Dict[str, List[str]]]]]:
+    """Parse a fixed-width data file column by column with NumPy.
     
-    # Otherwise, try to find the best match by length
-    line_length = len(line.rstrip())
-    best_match = "UNKNOWN"
-    best_score = 0
-    
-    for record_type, fields in record_types.items():
-        if fields:
-            # Calculate expected length for this record type
-            max_pos = max((f.start_pos + f.length - 1) for f in fields)
-            length_diff = abs(line_length - max_pos)
-            score = 1000 - length_diff  # Closer length = higher score
-            
-            if score > best_score:
-                best_score = score
-                best_match = record_type
+    The file is memory-mapped and reinterpreted in place as structured arrays
+    whose fields match each record layout, so nothing is copied or decoded up
+    front and stripping and decimal scaling run once per column instead of
+    once per record. Returns one (record_type, record_numbers,
+    values_by_field_name) entry per record type present, or None when the
+    file is not printable ASCII with uniform record widths and the caller
+    should fall back to the line-by-line parser.
+    """
+    with open(txt_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # All NumPy views of the map are released when this call returns
+            return _batch_parse_buffer(mm, layouts, detector)
+
+
+def _batch_parse_buffer(buffer, layouts: Dict[str, RecordLayout],
+                        detector: RecordTypeDetector) -> Optional[List[Tuple[str, List[int], Dict[str, List[str]]]]]:
+    """Structured-array parse of fixed-width records held in a bytes-like buffer"""
+    record_length = buffer.find(b'\n') + 1
+    if record_length < 2:
+        return None
     
-    return best_match if best_match != "UNKNOWN" else list(record_types.keys())[0]
+    # A final record without a trailing newline is handled as a separate tail
+    full_records, tail_length = divmod(len(buffer), record_length)
+    if tail_length not in (0, record_length - 1):
+        return None
+    
+    raw = np.frombuffer(buffer, dtype=np.uint8)
+    rows = raw[:full_records * record_length].reshape(-1, record_length)
+    body = rows[:, :-1]
+    tail = raw[full_records * record_length:]
+    if (rows[:, -1] != ord('\n')).any() or ((body < ord(' ')) | (body > ord('~'))).any() \
+            or ((tail < ord(' ')) | (tail > ord('~'))).any():
+        # Ragged records, CRLF line endings, control characters or non-ASCII data
+        return None
+    
+    # Whitespace-only lines are skipped, matching the line-by-line parser
+    line_length = record_length - 1
+    blank = (body == ord(' ')).all(axis=1)
+    if tail_length:
+        blank = np.append(blank, (tail == ord(' ')).all())
+    row_indices = np.flatnonzero(~blank)
+    
+    if detector.single_type is not None:
+        groups = [(detector.single_type, row_indices)]
+    else:
+        groups = _group_rows_by_record_type(body, tail, row_indices, detector)
+    
+    batches = []
+    for record_type, type_rows in groups:
+        if len(type_rows):
+            values = _batch_parse_columns(buffer, full_records, tail, record_length, layouts.get(record_type), type_rows)
+            batches.append((record_type, (type_rows + 1).tolist(), values))
+    
+    return batches
 
 
-def format_numeric_field(value: str, picture: str) -> str:
-    """Format a numeric field value according to its PICTURE clause"""
-    if not value or not picture:
-        return value
+def _group_rows_by_record_type(body: np.ndarray, tail: np.ndarray, row_indices: np.ndarray,
+                               detector: RecordTypeDetector) -> List[Tuple[str, np.ndarray]]:
+    """Split non-blank rows by record type.
     
-    try:
-        # Remove non-numeric characters for processing
-        clean_value = ''.join(c for c in value if c.isdigit())
-        if not clean_value:
-            return value
-        
-        # Check if field has decimal places
-        if 'V' in picture:
-            v_pos = picture.find('V')
-            decimal_part = picture[v_pos+1:]
-            decimal_places = decimal_part.count('9')
-            
-            if decimal_places > 0:
-                # Convert to float with proper decimal places
-                numeric_val = float(clean_value) / (10 ** decimal_places)
-                return f"{numeric_val:.{decimal_places}f}"
+    Detection only depends on a line's first character and its length without
+    trailing spaces, so the detector runs once per distinct pair of those
+    instead of once per line.
+    """
+    line_length = body.shape[1]
+    first = body[:, 0].astype(np.int64)
+    # Index of the last non-space character, counted from the end of the line
+    trailing = np.argmax(body[:, ::-1] != ord(' '), axis=1)
+    if len(tail):
+        first = np.append(first, int(tail[0]))
+        trailing = np.append(trailing, np.argmax(tail[::-1] != ord(' ')))
+    
+    keys = (first * (line_length + 1) + (line_length - trailing))[row_indices]
+    unique_keys, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    
+    record_types = []
+    for row in row_indices[first_seen].tolist():
+        line = tail if row == len(body) else body[row]
+        record_types.append(detector.detect(line.tobytes().decode('ascii')))
+    
+    type_names = list(dict.fromkeys(record_types))
+    type_codes = np.array([type_names.index(record_type) for record_type in record_types])[inverse]
+    return [(record_type, row_indices[type_codes == code]) for code, record_type in enumerate(type_names)]
+
+
+def _batch_parse_columns(buffer, full_records: int, tail: np.ndarray, record_length: int,
+                         layout: Optional[RecordLayout], type_rows: np.ndarray) -> Dict[str, List[str]]:
+    """Stripped and formatted column values of one record layout for the given rows"""
+    if layout is None:
+        return {}
+    
+    # Fields starting past the end of the line stay empty; the rest are clipped to it
+    line_length = record_length - 1
+    kept = np.flatnonzero((layout.offsets < line_length) & (layout.lengths > 0))
+    offsets = layout.offsets[kept]
+    widths = np.minimum(offsets + layout.lengths[kept], line_length) - offsets
+    names = [f'f{i}' for i in range(len(kept))]
+    columns = [(layout.names[i], layout.decimals[i], width) for i, width in zip(kept.tolist(), widths.tolist())]
+    
+    values = {}
+    if columns:
+        dtype = np.dtype({
+            'names': names,
+            'formats': [f'S{width}' for width in widths.tolist()],
+            'offsets': offsets.tolist(),
+            'itemsize': record_length
+        })
+        # Only the selected rows are gathered; the tail record (no newline) is appended last
+        has_tail = len(tail) > 0 and type_rows[-1] == full_records
+        records = np.frombuffer(buffer, dtype=dtype, count=full_records)[type_rows[:-1] if has_tail else type_rows]
+        if has_tail:
+            records = np.concatenate([records, np.frombuffer(tail.tobytes() + b'\n', dtype=dtype)])
+        for key, (name, decimals, width) in zip(names, columns):
+            column = np.char.strip(records[key]).astype('U')
+            if decimals is not None:
+                column = _format_decimal_column(column, decimals, width)
+            values[name] = column.tolist()
+    
+    return values
+
+
+def _format_decimal_column(column: np.ndarray, decimal_places: int, width: int) -> np.ndarray:
+    """Vectorized _format_decimal_value for a column of stripped field values"""
+    if np.char.isdigit(column).all():
+        if decimal_places > 0 and width <= 18:
+            # Same integer split as the scalar path, done for the whole column at once
+            whole, frac = np.divmod(column.astype(np.int64), 10 ** decimal_places)
+            return np.char.add(np.char.add(whole.astype(str), '.'), np.char.zfill(frac.astype(str), decimal_places))
+        if decimal_places == 0:
+            return column
+    
+    return np.array([_format_decimal_value(value, decimal_places) for value in column.tolist()])
+
+
+def _write_batch_rows(writer, batches: List[Tuple[str, List[int], Dict[str, List[str]]]], field_names) -> int:
+    """Write batch-parsed columns as CSV rows in file order, reporting progress every 5000 records"""
+    row_streams = []
+    for record_type, record_numbers, values in batches:
+        empty = [''] * len(record_numbers)
+        row_streams.append(zip(repeat(record_type), record_numbers, *(values.get(name, empty) for name in field_names)))
+    
+    # Each record type's rows are already in file order, so a lazy merge restores the original order
+    rows = row_streams[0] if len(row_streams) == 1 else heapq.merge(*row_streams, key=itemgetter(1))
+    
+    records_written = 0
+    while True:
+        chunk = list(islice(rows, 5000))
+        if not chunk:
+            break
+        writer.writerows(chunk)
+        records_written += len(chunk)
         
-        return clean_value
-    except:
-        return value
+        # Show progress for large files
+        if records_written % 5000 == 0:
+            print(f"  📝 Processed {records_written} records...")
+    
+    return records_written
 
 
-def export_to_csv(parsed_data: Dict[str, Any], fields: List[CobolField], original_file: str):
+def export_to_csv(parsed_data: Dict[str, Any], copybook: Copybook, original_file: str):
     """Export parsed COBOL data to CSV format"""
     try:
         print(f"\n📤 CSV Export")
@@ -675,22 +1252,24 @@ def export_to_csv(parsed_data: Dict[str, Any], fields: List[CobolField], origina
         output_file = output_manager.get_output_path('cobol_processor', output_filename, subfolder="")
         
         # Get data
-        records_by_type = parsed_data['records_by_type']
         record_types = parsed_data['record_types']
-        all_lines = parsed_data['all_lines']
         encoding = parsed_data['encoding']
+        total_lines = parsed_data['total_lines']
         
-        print(f"\n🔄 Processing all {len(all_lines)} records...")
+        print(f"\n🔄 Processing all {total_lines} records...")
         
         # Create CSV with all records
-        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        type_counts = {}
+        with open(output_file, 'w', newline='', encoding='utf-8', buffering=_IO_BUFFER_SIZE) as csvfile:
+            
+            # Collect all unique fields from all record types (they only hold elementary fields)
+            all_fields = {field.name: field for field_list in record_types.values() for field in field_list}
             
-            # Collect all unique fields from all record types
-            all_fields = {}
-            for record_type, field_list in record_types.items():
-                for field in field_list:
-                    if field.picture:  # Only elementary fields
-                        all_fields[field.name] = field
+            # Precompute field layouts once per record type
+            layouts = {
+                record_type: RecordLayout.from_fields(field_list)
+                for record_type, field_list in record_types.items()
+            }
             
             # Create header row
             header = ['RECORD_TYPE', 'RECORD_NUMBER'] + list(all_fields.keys())
@@ -698,46 +1277,68 @@ def export_to_csv(parsed_data: Dict[str, Any], fields: List[CobolField], origina
             writer = csv.writer(csvfile, delimiter=separator, quoting=csv.QUOTE_MINIMAL)
             writer.writerow(header)
             
-            # Process all lines
+            # Files with uniform record widths are parsed column-wise with NumPy
+            detector = RecordTypeDetector(record_types)
+            batches = _batch_parse_fixed_width(original_file, layouts, detector)
+            
             records_written = 0
-            for line_num, line in enumerate(all_lines, 1):
-                line = line.rstrip('\n\r')
-                if not line.strip():
-                    continue
-                
-                # Detect record type
-                record_type = detect_record_type(line, record_types)
-                
-                # Create row data
-                row_data = [record_type, line_num]
+            if batches is not None:
+                records_written = _write_batch_rows(writer, batches, all_fields)
+                for record_type, record_numbers, _ in batches:
+                    type_counts[record_type] = len(record_numbers)
+            else:
+                # Materialize each layout's (name, start_pos, slice, decimals) tuples once, not per line
+                columns_by_type = {
+                    record_type: tuple(layout.columns())
+                    for record_type, layout in layouts.items()
+                }
                 
-                # Extract field values
-                field_list = record_types.get(record_type, [])
-                field_values = {}
+                pending_rows = []
                 
-                # Parse fields for this record type
-                for field in field_list:
-                    if field.picture and field.start_pos <= len(line):
-                        start_pos = field.start_pos - 1  # Convert to 0-based
-                        end_pos = start_pos + field.length
-                        field_value = line[start_pos:end_pos].strip()
+                # Process all lines, streaming the data file line by line
+                with open(original_file, 'r', encoding=encoding, buffering=_IO_BUFFER_SIZE) as data_file:
+                    for line_num, line in enumerate(data_file, 1):
+                        # Universal newlines leave at most one trailing '\n'
+                        line = line[:-1] if line[-1:] == '\n' else line
+                        if not line.strip():
+                            continue
                         
-                        # Format numeric fields
-                        if field.field_type == 'numeric' and 'V' in (field.picture or ''):
-                            field_value = format_numeric_field(field_value, field.picture)
+                        # Detect record type
+                        record_type = detector.detect(line)
                         
-                        field_values[field.name] = field_value
-                
-                # Add values for all possible fields (fill missing with empty)
-                for field_name in all_fields.keys():
-                    row_data.append(field_values.get(field_name, ''))
-                
-                writer.writerow(row_data)
-                records_written += 1
+                        # Create row data
+                        row_data = [record_type, line_num]
+                        
+                        # Extract field values
+                        field_values = {}
+                        line_length = len(line)
+                        
+                        # Parse fields for this record type
+                        for name, start_pos, field_slice, decimals in columns_by_type.get(record_type, ()):
+                            if start_pos <= line_length:
+                                field_value = line[field_slice].strip()
+                                
+                                # Format numeric fields
+                                if decimals is not None:
+                                    field_value = _format_decimal_value(field_value, decimals)
+                                
+                                field_values[name] = field_value
+                        
+                        # Add values for all possible fields (fill missing with empty)
+                        for field_name in all_fields.keys():
+                            row_data.append(field_values.get(field_name, ''))
+                        
+                        pending_rows.append(row_data)
+                        records_written += 1
+                        type_counts[record_type] = type_counts.get(record_type, 0) + 1
+                        
+                        # Write rows in batches and show progress for large files
+                        if records_written % 5000 == 0:
+                            writer.writerows(pending_rows)
+                            pending_rows.clear()
+                            print(f"  📝 Processed {records_written} records...")
                 
-                # Show progress for large files
-                if records_written % 5000 == 0:
-                    print(f"  📝 Processed {records_written} records...")
+                writer.writerows(pending_rows)
         
         # Show statistics
         print(f"\n✅ CSV Export Complete!")
@@ -751,14 +1352,8 @@ def export_to_csv(parsed_data: Dict[str, Any], fields: List[CobolField], origina
         print(f"📏 Output file size: {format_file_size(file_size)}")
         print(f"\n📂 Full path: {output_file.absolute()}")
         
-        # Calculate actual record type breakdown from all processed records
+        # Record type breakdown was tallied while writing
         print(f"\n📋 Analyzing record type distribution...")
-        type_counts = {}
-        for line in all_lines:
-            if line.strip():
-                record_type = detect_record_type(line, record_types)
-                type_counts[record_type] = type_counts.get(record_type, 0) + 1
-        
         if type_counts:
             print(f"\n📋 Record types exported:")
             for record_type, count in sorted(type_counts.items()):
@@ -769,68 +1364,177 @@ def export_to_csv(parsed_data: Dict[str, Any], fields: List[CobolField], origina
         print(f"❌ Error exporting to CSV: {e}")
 
 
+def _entry_stat(entry: os.DirEntry) -> Optional[os.stat_result]:
+    """Current stat of a listed entry, or None when it disappeared after the directory was read.
+    
+    DirEntry.stat() would keep its first result: cached entries outlive a visit, and a
+    file rewritten in place doesn't change its directory's mtime.
+    """
+    try:
+        return os.stat(entry.path)
+    except FileNotFoundError:
+        return None
+
+
+def _get_browse_listing(current_dir: str, extension: str) -> BrowseListing:
+    """Sorted directories and matching files of current_dir.
+    
+    The entries are cached until the directory changes; the menu items, and the
+    file sizes in them, are built afresh for every listing.
+    """
+    parent = os.path.dirname(current_dir)
+    st = os.stat(current_dir)
+    key = (current_dir, extension, st.st_mtime_ns, st.st_size)
+    cached = _LISTING_CACHE.get(key)
+    if cached is not None:
+        _LISTING_CACHE.move_to_end(key)
+        return BrowseListing(*cached, parent)
+    
+    # The extension test is prepared once: exact-case names match through endswith in C,
+    # and only other spellings lowercase their suffix
+    extension_lower = extension.lower()
+    extension_variants = (extension_lower, extension_lower.upper())
+    suffix_length = len(extension_lower)
+    
+    # One scandir pass; DirEntry caches the file type from readdir, so no stat per entry
+    dir_entries = []
+    file_entries = []
+    with os.scandir(current_dir) as it:
+        for entry in it:
+            if entry.is_dir():
+                dir_entries.append(entry)
+                continue
+            
+            # Names are tested before is_file(), which costs a stat for symlinks
+            name = entry.name
+            if (name.endswith(extension_variants) or name[-suffix_length:].lower() == extension_lower) \
+                    and entry.is_file():
+                file_entries.append(entry)
+    
+    # Only the listed entries are sorted, each keyed once by its name
+    by_name = attrgetter('name')
+    dir_entries.sort(key=by_name)
+    file_entries.sort(key=by_name)
+    
+    _LISTING_CACHE[key] = (dir_entries, file_entries)
+    if len(_LISTING_CACHE) > _LISTING_CACHE_MAX:
+        _LISTING_CACHE.popitem(last=False)
+    return BrowseListing(dir_entries, file_entries, parent)
+
+
+def _build_dir_items(dir_entries: List[os.DirEntry]) -> List[Dict[str, Any]]:
+    """Menu items for directories"""
+    return [
+        {
+            'name': _DIR_ICON + entry.name,
+            'value': entry.name,
+            'description': 'Directory',
+            'type': 'dir'
+        }
+        for entry in dir_entries
+    ]
+
+
+def _get_stat_pool() -> ThreadPoolExecutor:
+    """Shared pool for browser stats; its threads start on demand and are reused across navigations"""
+    global _STAT_POOL
+    if _STAT_POOL is None:
+        _STAT_POOL = ThreadPoolExecutor(max_workers=_STAT_POOL_WORKERS, thread_name_prefix='browse-stat')
+    return _STAT_POOL
+
+
+def _shutdown_stat_pool():
+    """Stop the browser stat threads; the next browse session starts a fresh pool"""
+    global _STAT_POOL
+    if _STAT_POOL is not None:
+        _STAT_POOL.shutdown()
+        _STAT_POOL = None
+
+
+def _build_file_items(file_entries: List[os.DirEntry]) -> List[Dict[str, Any]]:
+    """Menu items for matching files, with their sizes"""
+    # Sizes are formatted in one batch
+    if len(file_entries) > _PARALLEL_STAT_THRESHOLD:
+        # On network or spinning-disk mounts each stat is a round trip; threads overlap them
+        file_stats = list(_get_stat_pool().map(_entry_stat, file_entries))
+    else:
+        file_stats = [_entry_stat(entry) for entry in file_entries]
+    
+    # Files removed since the directory was read are dropped from the listing
+    if None in file_stats:
+        kept = [(entry, file_stat) for entry, file_stat in zip(file_entries, file_stats) if file_stat is not None]
+        file_entries = [entry for entry, _ in kept]
+        file_stats = [file_stat for _, file_stat in kept]
+    file_sizes = _format_file_sizes([file_stat.st_size for file_stat in file_stats])
+    return [
+        {
+            'name': _FILE_ICON + entry.name,
+            'value': entry.name,
+            'description': _FILE_DESCRIPTION % file_size,
+            'type': 'file'
+        }
+        for entry, file_stat, file_size in zip(file_entries, file_stats, file_sizes)
+    ]
+
+
 def browse_for_file(extension: str, title: str, start_dir: Optional[str] = None) -> Optional[str]:
     """Interactive file browser to select a file with specific extension"""
+    selection = _browse_for_file_with_stat(extension, title, start_dir)
+    return selection[0] if selection else None
+
+
+def _browse_for_file_with_stat(extension: str, title: str,
+                               start_dir: Optional[str] = None) -> Optional[Tuple[str, os.stat_result]]:
+    """browse_for_file that also returns the selected file's stat, taken when it is chosen"""
+    try:
+        return _run_browse_session(extension, title, start_dir)
+    finally:
+        # The stat threads only serve navigation; none are left idle once the browser closes
+        _shutdown_stat_pool()
+
+
+def _run_browse_session(extension: str, title: str,
+                        start_dir: Optional[str] = None) -> Optional[Tuple[str, os.stat_result]]:
+    """Browser loop behind _browse_for_file_with_stat"""
     current_dir = start_dir if start_dir and os.path.exists(start_dir) else os.getcwd()
+    # Resolved once; navigation below only appends entry names or takes the dirname
+    current_dir = os.path.abspath(current_dir)
+    
+    # The extension is canonicalized once, so every listing of this session shares
+    # one cache key, and the manual-entry prompt is formatted a single time
+    extension = extension.lower()
+    if not extension.startswith('.'):
+        extension = '.' + extension
+    manual_prompt = f"Enter full path to {extension} file:"
+    
+    visible_limit = _BROWSE_PAGE_SIZE
+    items = []
+    listing = None
     
     while True:
-        # Get directory contents
-        items = []
-        
-        # Add parent directory option
-        if current_dir != os.path.dirname(current_dir):  # Not at root
-            items.append({
-                'name': '📁 ..',
-                'value': '..',
-                'description': 'Parent directory',
-                'type': 'parent'
-            })
-        
-        # List directories and files
+        # Get directory contents; the menu list is refilled rather than reallocated
+        items.clear()
+        
+        # List directories and files, one page at a time for very large directories
         try:
-            entries = sorted(os.listdir(current_dir))
+            # Kept while more pages of the same directory are shown; re-listed on every visit
+            if listing is None:
+                listing = _get_browse_listing(current_dir, extension)
+            page_items, has_more = listing.page(visible_limit)
             
-            # Add directories first
-            for entry in entries:
-                full_path = os.path.join(current_dir, entry)
-                if os.path.isdir(full_path):
-                    items.append({
-                        'name': f'📁 {entry}',
-                        'value': entry,
-                        'description': 'Directory',
-                        'type': 'dir'
-                    })
+            # Add parent directory option
+            if listing.parent != current_dir:  # Not at root
+                items.append(_PARENT_ITEM)
+            items.extend(page_items)
+            if has_more:
+                items.append(_MORE_ITEM)
             
-            # Add files with matching extension
-            for entry in entries:
-                full_path = os.path.join(current_dir, entry)
-                if os.path.isfile(full_path) and entry.lower().endswith(extension.lower()):
-                    file_size = format_file_size(os.path.getsize(full_path))
-                    items.append({
-                        'name': f'📄 {entry}',
-                        'value': entry,
-                        'description': f'File ({file_size})',
-                        'type': 'file'
-                    })
+            # Add manual entry and cancel options
+            items.extend(_TRAILING_ITEMS)
             
-            # Add manual entry option
-            items.append({
-                'name': '✏️  Enter path manually',
-                'value': 'manual',
-                'description': 'Type the full file path',
-                'type': 'manual'
-            })
-            
-            # Add cancel option
-            items.append({
-                'name': '❌ Cancel',
-                'value': 'cancel',
-                'description': 'Cancel file selection',
-                'type': 'cancel'
-            })
-            
-            # Show current directory
-            print(f"\n📂 Current directory: {current_dir}")
+            # Show current directory; one write and one flush before the menu takes the terminal
+            sys.stdout.write(f"\n📂 Current directory: {current_dir}\n")
+            sys.stdout.flush()
             
             # Show menu
             selected = interactive_menu(title, items)
@@ -840,11 +1544,12 @@ def browse_for_file(extension: str, title: str, start_dir: Optional[str] = None)
             
             if selected['type'] == 'manual':
                 # Manual path entry
-                manual_path = text_input(f"Enter full path to {extension} file:")
+                manual_path = text_input(manual_prompt)
                 if manual_path and manual_path.strip():
                     manual_path = manual_path.strip()
-                    if validate_file_path(manual_path, extension):
-                        return os.path.abspath(manual_path)
+                    file_stat = validate_file_path(manual_path, extension)
+                    if file_stat:
+                        return os.path.abspath(manual_path), file_stat
                     else:
                         print(f"❌ Invalid {extension} file: {manual_path}")
                         if not confirm("Try again?", default=True):
@@ -855,23 +1560,37 @@ def browse_for_file(extension: str, title: str, start_dir: Optional[str] = None)
                         return None
                     continue
             
+            elif selected['type'] == 'more':
+                # Show the next page of this directory
+                visible_limit += _BROWSE_PAGE_SIZE
+            
             elif selected['type'] == 'parent':
                 # Go to parent directory
-                current_dir = os.path.dirname(current_dir)
+                current_dir = listing.parent
+                listing = None
+                visible_limit = _BROWSE_PAGE_SIZE
             
             elif selected['type'] == 'dir':
                 # Enter directory
                 current_dir = os.path.join(current_dir, selected['value'])
+                listing = None
+                visible_limit = _BROWSE_PAGE_SIZE
             
             elif selected['type'] == 'file':
-                # File selected
+                # File selected; stat'ed now, so process_files sees the file as it is
                 file_path = os.path.join(current_dir, selected['value'])
-                return os.path.abspath(file_path)
+                try:
+                    return file_path, os.stat(file_path)
+                except FileNotFoundError:
+                    print(f"❌ File no longer exists: {file_path}")
+                    listing = None
                 
         except PermissionError:
             print(f"❌ Permission denied: {current_dir}")
             current_dir = os.path.dirname(current_dir)
-        except Exception as e:
+            listing = None
+            visible_limit = _BROWSE_PAGE_SIZE
+        except OSError as e:
             print(f"❌ Error browsing directory: {e}")
             return None
 
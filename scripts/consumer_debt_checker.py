@@ -6,21 +6,41 @@ Consumer API Debt Checker - Consulta de deudas mediante API Consumer
 import os
 import sys
 import csv
+import hashlib
 import json
+import logging
+import math
+import re
+import sqlite3
 import time
+import threading
 import requests
+import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from collections import Counter, OrderedDict
+from itertools import chain
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from dataclasses import dataclass
 
-# Add the src directory to path to import scli modules
-sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
+# Add the src directory to path to import scli modules, unless the package is
+# already loaded (run through the scli script loader)
+if 'scli' not in sys.modules:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'src'))
 from scli.menu_utils import interactive_menu, text_input, confirm
 from scli.output_manager import OutputManager
 from scli.config_loader import get_script_config, create_sample_script_config
 from scli.logger import get_logger, log_request, log_config_info
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Optional speedup; responses fall back to the standard json parser
+
 
 DESCRIPTION = "Consumer debt checker - Query debts via Consumer API"
 
@@ -28,6 +48,124 @@ DESCRIPTION = "Consumer debt checker - Query debts via Consumer API"
 # Initialize logger
 logger = get_logger("consumer_debt_checker")
 
+# Kept-alive connections to the API host; concurrent batches grow the pool to their width
+_DEFAULT_POOL_SIZE = 32
+
+# Results with these statuses are transient failures; their cache entries expire
+_TRANSIENT_STATUSES = frozenset({'TIMEOUT', 'CONNECTION_ERROR', 401, 403, 429, 500, 502, 503, 504})
+
+# Statuses with which the server throttles us; batches shrink their concurrency on them
+_THROTTLE_STATUSES = frozenset({429, 503})
+
+# Statuses the connection pool retries with backoff before handing the response over;
+# throttling (429/503) is left to the caller, which backs off on Retry-After itself
+_RETRY_STATUSES = frozenset({502, 504})
+
+# Longest pause between transport retries, in seconds
+_RETRY_BACKOFF_MAX = 10.0
+
+# Shortest pause between batches once the server has throttled one
+_MIN_BATCH_BACKOFF = 1.0
+
+# Completed requests between log lines reporting the adaptive concurrency limit
+_LIMITER_LOG_INTERVAL = 100
+
+# Memoized loan ids and amounts; both are pure and amounts repeat a lot across installments
+_PARSE_CACHE_SIZE = 8192
+
+# Rows per pandas chunk when filtering credit numbers out of large exports
+_CSV_CHUNK_ROWS = 100_000
+
+# Credits looked up per query when pre-checking the results store
+_STORE_LOOKUP_CHUNK = 500
+
+# Column name keywords marking likely credit code columns, strongest first
+_CREDIT_COLUMN_KEYWORDS = ('credit', 'codigo', 'ident', 'loan', 'credito')
+_NUMBER_COLUMN_KEYWORDS = ('numero', 'number', 'num', 'id')
+
+# Column listing suffix and menu description for each column classification
+_COLUMN_HINTS = {
+    'strong': (" ⭐ (Potential credit code column)", "⭐ Potential credit code column"),
+    'weak': (" ✓ (May contain credit codes)", "✓ May contain credit codes"),
+    'plain': ("", "Regular column"),
+}
+
+# Last (second, ISO string) pair used to timestamp query results
+_last_timestamp = (0, '')
+
+# Error message patterns and their categories, in priority order
+_ERROR_PATTERNS = [
+    ("NO SE PUDO VALIDAR OPERACION", "NO_VALIDAR_OPERACION"),
+    ("REVISAR SITUACION DE PRESTAMO", "REVISAR_SITUACION_PRESTAMO"),
+    ("REVISAR SITUACION CONTABLE", "REVISAR_SITUACION_CONTABLE"),
+    ("LA APLICACION SE ENCUENTRA DESACTIVA", "APLICACION_DESACTIVA"),
+    ("REINTENTAR POR CONTEXTO", "REINTENTAR_CONTEXTO"),
+    ("UNAUTHORIZED|TOKEN", "TOKEN_INVALIDO"),
+]
+
+# All patterns in one alternation, one group each, so a message is scanned once
+_ERROR_RE = re.compile('|'.join(f'({pattern})' for pattern, _ in _ERROR_PATTERNS), re.IGNORECASE)
+_ERROR_CATEGORIES = [category for _, category in _ERROR_PATTERNS]
+
+# The processing summary groups errors more coarsely than the results file, under its own labels
+_SUMMARY_ERROR_PATTERNS = [
+    ("NO SE PUDO VALIDAR OPERACION", "NO_VALIDAR_OPERACION"),
+    ("REVISAR SITUACION", "REVISAR_SITUACION"),
+    ("APLICACION", "APLICACION_DESACTIVA"),
+    ("CONTEXTO", "REINTENTAR_CONTEXTO"),
+    ("UNAUTHORIZED", "TOKEN_INVALIDO"),
+]
+_SUMMARY_ERROR_RE = re.compile('|'.join(f'({pattern})' for pattern, _ in _SUMMARY_ERROR_PATTERNS), re.IGNORECASE)
+_SUMMARY_ERROR_CATEGORIES = [category for _, category in _SUMMARY_ERROR_PATTERNS]
+
+
+def _match_error_category(error_message: str, pattern: re.Pattern, categories: List[str], default: str) -> str:
+    """Category of the highest-priority alternative of `pattern` found in error_message"""
+    # The leftmost match isn't necessarily the highest priority one, so keep the best seen
+    best = None
+    for match in pattern.finditer(error_message):
+        if best is None or match.lastindex < best:
+            best = match.lastindex
+            if best == 1:
+                break
+    return categories[best - 1] if best is not None else default
+
+
+def _parse_json(response: requests.Response):
+    """Decode a JSON response body, with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            # Re-decoded by requests, which honours the declared charset and raises its own
+            # JSONDecodeError (a RequestException) for bodies that really aren't JSON
+            pass
+    return response.json()
+
+
+def _result_timestamp() -> str:
+    """Local time to the second in ISO format, formatted once per second across all results"""
+    global _last_timestamp
+    now = int(time.time())
+    if _last_timestamp[0] != now:
+        _last_timestamp = (now, datetime.fromtimestamp(now).isoformat())
+    return _last_timestamp[1]
+
+
+def _cache_dir() -> str:
+    """Per-user cache directory for scli"""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'scli')
+
+
+def _retry_after_seconds(response: requests.Response) -> float:
+    """Seconds a throttling response asks us to wait, capped at a minute"""
+    try:
+        return min(max(float(response.headers.get('Retry-After', 1)), 0.0), 60.0)
+    except ValueError:
+        # HTTP-date form; a short pause is enough since the limit is halved too
+        return 1.0
+
 
 @dataclass
 class ConsumerAPIConfig:
@@ -40,11 +178,18 @@ class ConsumerAPIConfig:
     timeout: int = 30
     scope: str = "Internet_Clientes_Persona"
     oauth_type: str = "iam-scf"
+    cache_max_entries: int = 10000
+    cache_negative_ttl: float = 300.0
+    persist_token: bool = False  # Opt-in: saves the bearer token to disk for later runs
+    results_ttl: int = 0  # Seconds results are reused across runs; 0 keeps them for this run only
+    max_retries: int = 3  # Transport-level retries for connection errors and gateway statuses (502/504)
+    retry_backoff: float = 0.5
     
     @classmethod
     def from_config(cls, config: Dict) -> 'ConsumerAPIConfig':
         """Create ConsumerAPIConfig from configuration dictionary"""
         api_config = config.get('api', {})
+        cache_config = config.get('cache', {})
         
         return cls(
             base_url=api_config.get('base_url', ''),
@@ -54,7 +199,13 @@ class ConsumerAPIConfig:
             client_secret=api_config.get('client_secret', ''),
             timeout=api_config.get('timeout', 30),
             scope=api_config.get('scope', 'Internet_Clientes_Persona'),
-            oauth_type=api_config.get('oauth_type', 'iam-scf')
+            oauth_type=api_config.get('oauth_type', 'iam-scf'),
+            max_retries=api_config.get('max_retries', 3),
+            retry_backoff=api_config.get('retry_backoff', 0.5),
+            cache_max_entries=cache_config.get('max_entries', 10000),
+            cache_negative_ttl=cache_config.get('negative_ttl_seconds', 300.0),
+            persist_token=cache_config.get('persist_token', False),
+            results_ttl=cache_config.get('results_ttl_seconds', 0)
         )
     
     @property
@@ -67,6 +218,120 @@ class ConsumerAPIConfig:
         return f"{self.base_url}{self.debt_path}/{loan_id}/installments_payable"
 
 
+class DebtCache:
+    """Query results persisted in SQLite, so later runs skip credits that were already answered"""
+    
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        # Autocommit; every put is one short write transaction in WAL mode
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS results (credit TEXT PRIMARY KEY, ts INTEGER NOT NULL, json TEXT NOT NULL)'
+        )
+        self._lock = threading.Lock()  # One connection is shared by the query workers
+    
+    def get(self, credit_number: str, max_age: float) -> Optional[Dict]:
+        """Stored result for credit_number if it is at most max_age seconds old"""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT json FROM results WHERE credit = ? AND ts >= ?',
+                (credit_number, int(time.time() - max_age))
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_many(self, credit_numbers: List[str], max_age: float) -> Dict[str, Dict]:
+        """Stored results at most max_age seconds old for any of credit_numbers, keyed by credit"""
+        found = {}
+        min_ts = int(time.time() - max_age)
+        with self._lock:
+            # Chunked to stay below SQLite's bound-parameter limit
+            for start in range(0, len(credit_numbers), _STORE_LOOKUP_CHUNK):
+                chunk = credit_numbers[start:start + _STORE_LOOKUP_CHUNK]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self.connection.execute(
+                    f'SELECT credit, json FROM results WHERE ts >= ? AND credit IN ({placeholders})',
+                    (min_ts, *chunk)
+                ).fetchall()
+                for credit_number, payload in rows:
+                    found[credit_number] = json.loads(payload)
+        return found
+    
+    def put(self, credit_number: str, result: Dict):
+        """Store or replace the result for credit_number"""
+        payload = json.dumps(result)
+        with self._lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO results (credit, ts, json) VALUES (?, ?, ?)',
+                (credit_number, int(time.time()), payload)
+            )
+    
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class AdaptiveLimiter:
+    """AIMD cap on in-flight requests: grows slowly on success, halves when the server throttles"""
+    
+    def __init__(self, minimum: int = 1, maximum: int = 64, initial: int = 8):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(maximum, initial)))
+        self.in_flight = 0
+        self.completed = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self):
+        """Wait for a free slot under the current limit"""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+    
+    def release(self, status_code=None):
+        """Free a slot and adapt the limit to the response status (None leaves it unchanged)"""
+        with self._condition:
+            self.in_flight -= 1
+            self.completed += 1
+            if status_code in _THROTTLE_STATUSES:
+                self.limit = max(self.minimum, self.limit // 2)
+            elif isinstance(status_code, int) and 200 <= status_code < 300:
+                self.limit = min(self.maximum, self.limit + 0.5)
+            
+            if self.completed % _LIMITER_LOG_INTERVAL == 0:
+                logger.info(f"⚡ Concurrency limit {int(self.limit)} after {self.completed} requests")
+            self._condition.notify_all()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second on average, bursts of up to `capacity`
+    
+    The bucket starts with a single token, so the first request goes out at once and the
+    following ones are paced from the start; a burst needs idle time to build up first.
+    """
+    
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Take a token, sleeping only for the part of the interval that hasn't already passed"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # The token is reserved now, so concurrent callers queue up behind each other
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
 class ConsumerAPI:
     """Consumer API client"""
     
@@ -74,36 +339,68 @@ class ConsumerAPI:
         self.config = config
         self.access_token = None
         self.token_expires_at = None
-        self.response_cache = {}  # Cache for avoiding duplicate queries
-        logger.info("Initialized Consumer API client")
-        logger.debug(f"Base URL: {config.base_url}")
-        logger.debug(f"Auth URL: {config.auth_url}")
-        logger.debug(f"Client ID: {config.client_id[:8]}***")
+        self.response_cache = OrderedDict()  # credit_number -> (result, cached_at), least recently used first
+        self._cache_lock = threading.Lock()
+        self._auth_lock = threading.Lock()  # Held while the token is refreshed, so workers share one refresh
+        self._inflight: Dict[str, Future] = {}  # credit_number -> pending query, shared by concurrent duplicates
         
-    def authenticate(self) -> bool:
-        """Authenticate with Consumer API"""
-        logger.info("Starting authentication with Consumer API")
+        # One session for every call, so the TCP/TLS connection is kept alive between queries
+        self.session = requests.Session()
+        self.session.headers.update({
+            'X-Consumer-Client-Id': config.client_id,
+            'User-Agent': 'curl/8.7.1'  # Emulate curl to bypass User-Agent blocking
+        })
+        self._pool_size = 0
+        self._ensure_pool_size(_DEFAULT_POOL_SIZE)
         
-        headers = {
-            'oauth_type': self.config.oauth_type,
-            'X-Consumer-Client-Id': self.config.client_id,
+        # Request headers and form data are invariant; the debt headers change only with the token
+        self._auth_headers = {
+            'oauth_type': config.oauth_type,
+            'X-Consumer-Client-Id': config.client_id,
             'Content-Type': 'application/x-www-form-urlencoded',
             'User-Agent': 'curl/8.7.1',  # Emulate curl to bypass User-Agent blocking
             'Accept': '*/*'
         }
-        
-        data = {
+        self._auth_data = {
             'grant_type': 'client_credentials',
-            'scope': self.config.scope
+            'scope': config.scope
         }
+        self._debt_headers = None
+        
+        # Results from earlier runs, when enabled; the file is specific to the API host and client
+        self.result_store = None
+        if config.results_ttl > 0:
+            identity = f"{config.base_url}|{config.client_id}"
+            store_path = os.path.join(_cache_dir(), 'consumer_debt',
+                                      f"results_{hashlib.sha256(identity.encode()).hexdigest()[:16]}.sqlite3")
+            try:
+                self.result_store = DebtCache(store_path)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Result cache disabled: {e}")
+        
+        # A token saved by an earlier run is reused until it expires
+        if config.persist_token:
+            self._load_cached_token()
+        logger.info("Initialized Consumer API client")
+        logger.debug("Base URL: %s", config.base_url)
+        logger.debug("Auth URL: %s", config.auth_url)
+        logger.debug("Client ID: %s***", config.client_id[:8])
+        
+    def authenticate(self) -> bool:
+        """Authenticate with Consumer API"""
+        logger.info("Starting authentication with Consumer API")
+        
+        headers = self._auth_headers
+        data = self._auth_data
         
         try:
             # Log request details
             logger.info(f"🔍 Sending authentication request...")
-            logger.debug(f"URL: {self.config.auth_url}")
-            logger.debug(f"Headers: {headers}")
-            logger.debug(f"Data: {data}")
-            logger.debug(f"Auth credentials: {self.config.client_id}:{self.config.client_secret[:4]}***")
+            # Arguments are formatted lazily, only when DEBUG output is enabled
+            logger.debug("URL: %s", self.config.auth_url)
+            logger.debug("Headers: %s", headers)
+            logger.debug("Data: %s", data)
+            logger.debug("Auth credentials: %s:%s***", self.config.client_id, self.config.client_secret[:4])
             
             log_request(
                 logger, 
@@ -115,7 +412,7 @@ class ConsumerAPI:
             
             # Make the request with detailed logging
             logger.info(f"📡 Making POST request to Consumer API...")
-            response = requests.post(
+            response = self.session.post(
                 self.config.auth_url,
                 headers=headers,
                 data=data,
@@ -125,7 +422,7 @@ class ConsumerAPI:
             )
             
             logger.info(f"📥 Received response: {response.status_code}")
-            logger.debug(f"Response headers: {dict(response.headers)}")
+            logger.debug("Response headers: %s", response.headers)
             
             # Check if this is a redirect
             if response.status_code in [301, 302, 303, 307, 308]:
@@ -143,17 +440,21 @@ class ConsumerAPI:
             )
             
             if response.status_code == 200:
-                auth_data = response.json()
-                self.access_token = auth_data.get('access_token')
+                auth_data = _parse_json(response)
                 expires_in = int(auth_data.get('expires_in', 300))
-                self.token_expires_at = time.time() + expires_in - 30
+                self._set_token(auth_data.get('access_token'), time.time() + expires_in - 30)
+                if self.config.persist_token and self.access_token:
+                    self._store_cached_token()
                 
                 logger.info(f"✅ Authentication successful, token expires in {expires_in}s")
-                logger.debug(f"Access token: {self.access_token[:20]}..." if self.access_token else "No token received")
+                if self.access_token:
+                    logger.debug("Access token: %s...", self.access_token[:20])
+                else:
+                    logger.debug("No token received")
                 return True
             else:
                 logger.error(f"❌ Authentication failed with status {response.status_code}")
-                logger.error(f"Response headers: {dict(response.headers)}")
+                logger.error("Response headers: %s", response.headers)
                 
                 # Enhanced logging for common error scenarios
                 if response.status_code == 403:
@@ -205,201 +506,480 @@ class ConsumerAPI:
             print(f"❌ Connection error during authentication: {e}")
             return False
     
+    def _ensure_pool_size(self, size: int):
+        """Mount a connection pool on the API host that can keep at least `size` connections alive"""
+        if size <= self._pool_size or not self.config.base_url:
+            return
+        
+        # Connections beyond pool_maxsize are closed after each request and pay a new handshake
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=self._transport_retry())
+        # The smaller pool it replaces would otherwise keep its idle sockets open until exit
+        previous = self.session.adapters.get(self.config.base_url)
+        self.session.mount(self.config.base_url, adapter)
+        if previous is not None:
+            previous.close()
+        self._pool_size = size
+    
+    def _transport_retry(self) -> Retry:
+        """Retry policy applied by the connection pool before a response reaches query_debt"""
+        # 500 is left out: the API reports application errors with it, and those are definitive
+        return Retry(
+            total=self.config.max_retries,
+            backoff_factor=self.config.retry_backoff,
+            status_forcelist=_RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'POST'}),
+            backoff_max=_RETRY_BACKOFF_MAX,
+            respect_retry_after_header=False,
+            raise_on_status=False
+        )
+    
+    def close(self):
+        """Release the pooled connections and the result cache"""
+        self.session.close()
+        if self.result_store is not None:
+            self.result_store.close()
+            self.result_store = None
+    
+    def __enter__(self) -> 'ConsumerAPI':
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _set_token(self, access_token: Optional[str], expires_at: float):
+        """Adopt a token and rebuild the headers that carry it"""
+        self.access_token = access_token
+        self.token_expires_at = expires_at
+        self.session.headers['Authorization'] = f'Bearer {access_token}'
+        self._debt_headers = {
+            'X-Consumer-Client-Id': self.config.client_id,
+            'Authorization': f'Bearer {access_token}',
+            'Accept': 'application/json',
+            'User-Agent': 'curl/8.7.1'  # Consistent User-Agent
+        }
+    
+    def _token_cache_file(self) -> str:
+        """File holding the last token for this endpoint, client and scope"""
+        identity = f"{self.config.auth_url}|{self.config.client_id}|{self.config.scope}"
+        return os.path.join(_cache_dir(), 'tokens',
+                            f"consumer_{hashlib.sha256(identity.encode()).hexdigest()[:16]}.json")
+    
+    def _load_cached_token(self):
+        """Adopt the saved token when it is still valid"""
+        try:
+            with open(self._token_cache_file(), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            access_token = cached['access_token']
+            expires_at = float(cached['expires_at'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        
+        if access_token and time.time() < expires_at:
+            self._set_token(access_token, expires_at)
+            logger.info(f"🔑 Reusing saved token, expires in {int(expires_at - time.time())}s")
+    
+    def _store_cached_token(self):
+        """Atomically save the current token, readable only by the owner"""
+        cache_file = self._token_cache_file()
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(cache_file), mode=0o700, exist_ok=True)
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({'access_token': self.access_token, 'expires_at': self.token_expires_at}, f)
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            # Only an optimization; the next run authenticates again
+            logger.debug("Could not save token: %s", e)
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+    
     def is_token_valid(self) -> bool:
         """Check if current token is valid"""
         return self.access_token and time.time() < self.token_expires_at
     
+    def authenticate_if_needed(self, margin: float = 60.0) -> bool:
+        """Authenticate unless the current token stays valid for at least `margin` more seconds"""
+        # A token about to expire is refreshed now rather than in the middle of the next operation
+        if self.is_token_valid() and self.token_expires_at - time.time() > margin:
+            logger.debug("Reusing current token, %ds left", int(self.token_expires_at - time.time()))
+            return True
+        return self.authenticate()
+    
     def ensure_authentication(self) -> bool:
         """Ensure we have a valid token"""
-        if not self.is_token_valid():
+        if self.is_token_valid():
+            return True
+        
+        with self._auth_lock:
+            # Another worker may have refreshed the token while this one waited
+            if self.is_token_valid():
+                return True
             print("🔄 Token expired, re-authenticating...")
             return self.authenticate()
-        return True
     
-    def format_loan_id(self, credit_number: str) -> str:
+    def _reauthenticate(self, rejected_headers: Dict) -> bool:
+        """Replace a token the API rejected; concurrent callers wait for and reuse a single refresh"""
+        with self._auth_lock:
+            if self._debt_headers is not rejected_headers and self.is_token_valid():
+                return True
+            
+            self.access_token = None
+            self.token_expires_at = None
+            return self.authenticate()
+    
+    @staticmethod
+    @lru_cache(maxsize=_PARSE_CACHE_SIZE)
+    def format_loan_id(credit_number: str) -> str:
         """Format credit number according to API standard"""
-        clean_number = credit_number.replace('00350001', '')
-        
-        if len(clean_number) > 12:
-            clean_number = clean_number[-12:]
-        elif len(clean_number) < 12:
-            clean_number = clean_number.zfill(12)
-        
-        return f"00350001{clean_number}"
+        # Only a leading entity prefix is dropped; the same digits inside the number are kept
+        clean_number = credit_number[8:] if credit_number.startswith('00350001') else credit_number
+        return '00350001' + clean_number[-12:].rjust(12, '0')
     
     def categorize_error(self, error_message: str) -> str:
         """Categorize error message"""
         if not error_message:
             return "UNKNOWN"
         
-        error_upper = error_message.upper()
-        
-        if "NO SE PUDO VALIDAR OPERACION" in error_upper:
-            return "NO_VALIDAR_OPERACION"
-        elif "REVISAR SITUACION DE PRESTAMO" in error_upper:
-            return "REVISAR_SITUACION_PRESTAMO"
-        elif "REVISAR SITUACION CONTABLE" in error_upper:
-            return "REVISAR_SITUACION_CONTABLE"
-        elif "LA APLICACION SE ENCUENTRA DESACTIVA" in error_upper:
-            return "APLICACION_DESACTIVA"
-        elif "REINTENTAR POR CONTEXTO" in error_upper:
-            return "REINTENTAR_CONTEXTO"
-        elif "UNAUTHORIZED" in error_upper or "TOKEN" in error_upper:
-            return "TOKEN_INVALIDO"
-        else:
-            return f"OTRO"
+        return _match_error_category(error_message, _ERROR_RE, _ERROR_CATEGORIES, "OTRO")
     
-    def parse_amount(self, amount_str: str) -> float:
+    @staticmethod
+    @lru_cache(maxsize=_PARSE_CACHE_SIZE)
+    def parse_amount(amount_str: str) -> float:
         """Convert API amount format to Chilean pesos"""
-        if not amount_str or not amount_str.isdigit():
+        if not amount_str:
             return 0.0
         
-        amount_int = int(amount_str)
-        return amount_int / 10000.0
+        # Only plain ASCII digits are amounts; int() alone would also take signs, spaces and
+        # underscores, letting a negative or malformed amount into the totals
+        if not (amount_str.isascii() and amount_str.isdigit()):
+            logger.warning(f"Ignoring malformed amount {amount_str!r}")
+            return 0.0
+        return int(amount_str) / 10000.0
     
     def query_debt(self, credit_number: str) -> Dict:
         """Query debt for specific credit number with caching and retry logic"""
-        logger.debug(f"Querying debt for credit number: {credit_number}")
+        logger.debug("Querying debt for credit number: %s", credit_number)
         
         # Check cache first
-        if credit_number in self.response_cache:
-            logger.debug(f"Using cached response for credit {credit_number}")
-            cached_result = self.response_cache[credit_number].copy()
-            cached_result['from_cache'] = True
-            return cached_result
+        cached = self._get_cached_result(credit_number)
+        if cached is not None:
+            logger.debug("Using cached response for credit %s", credit_number)
+            # Cached results are never mutated, so a hit is one overlay copy
+            return {**cached, 'from_cache': True}
+        
+        # Then results stored by earlier runs
+        stored = self._get_stored_result(credit_number)
+        if stored is not None:
+            logger.debug("Using stored response for credit %s", credit_number)
+            self._cache_result(credit_number, stored, persist=False)
+            return {**stored, 'from_cache': True}
+        
+        # A query already running for this credit is awaited instead of repeated
+        with self._cache_lock:
+            pending = self._inflight.get(credit_number)
+            if pending is None:
+                pending = self._inflight[credit_number] = Future()
+                owner = True
+            else:
+                owner = False
+        
+        if not owner:
+            logger.debug("Waiting for in-flight query of credit %s", credit_number)
+            return {**pending.result(), 'from_cache': True}
         
         # Try to query (with retry on auth errors)
-        return self._query_debt_with_retry(credit_number)
+        try:
+            result = self._query_debt_with_retry(credit_number)
+            pending.set_result(result)
+            return result
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._cache_lock:
+                del self._inflight[credit_number]
+    
+    def _get_cached_result(self, credit_number: str) -> Optional[Dict]:
+        """Cached result for credit_number, or None when absent or an expired transient failure"""
+        with self._cache_lock:
+            entry = self.response_cache.get(credit_number)
+            if entry is None:
+                return None
+            
+            result, cached_at = entry
+            if result['status_code'] in _TRANSIENT_STATUSES \
+                    and time.time() - cached_at > self.config.cache_negative_ttl:
+                del self.response_cache[credit_number]
+                return None
+            
+            self.response_cache.move_to_end(credit_number)
+            return result
     
-    def _query_debt_with_retry(self, credit_number: str, retry_count: int = 0) -> Dict:
-        """Internal method to query debt with automatic re-authentication"""
-        max_retries = 2
+    def _cache_result(self, credit_number: str, result: Dict, persist: bool = True):
+        """Cache a result, evicting the least recently used entries beyond the size limit"""
+        with self._cache_lock:
+            # Stored as is: results are complete when cached and nobody modifies them afterwards
+            self.response_cache[credit_number] = (result, time.time())
+            self.response_cache.move_to_end(credit_number)
+            while len(self.response_cache) > self.config.cache_max_entries:
+                self.response_cache.popitem(last=False)
         
-        if not self.ensure_authentication():
-            logger.error(f"Authentication failed for credit {credit_number}")
-            return {
-                'credit_number': credit_number,
-                'status_code': 'AUTH_ERROR',
-                'error': 'Authentication failed',
-                'response': None,
-                'timestamp': datetime.now().isoformat(),
-                'from_cache': False
-            }
+        # Only definitive answers outlive the run; transient failures are asked again next time
+        if persist and self.result_store is not None and result['status_code'] not in _TRANSIENT_STATUSES:
+            try:
+                self.result_store.put(credit_number, result)
+            except sqlite3.Error as e:
+                logger.debug("Could not store result for %s: %s", credit_number, e)
+    
+    def _get_stored_result(self, credit_number: str) -> Optional[Dict]:
+        """Result stored by an earlier run within the configured TTL, if any"""
+        if self.result_store is None:
+            return None
+        try:
+            return self.result_store.get(credit_number, self.config.results_ttl)
+        except sqlite3.Error as e:
+            logger.debug("Could not read stored result for %s: %s", credit_number, e)
+            return None
+    
+    def split_cached(self, credit_numbers: List[str]) -> Tuple[List[Dict], List[str]]:
+        """Split credit_numbers into results already cached or stored and the credits still to query"""
+        cached_results = []
+        pending = []
+        for credit_number in credit_numbers:
+            cached = self._get_cached_result(credit_number)
+            if cached is not None:
+                cached_results.append({**cached, 'from_cache': True})
+            else:
+                pending.append(credit_number)
         
-        formatted_id = self.format_loan_id(credit_number)
-        debt_url = self.config.debt_url(formatted_id)
+        if self.result_store is None or not pending:
+            return cached_results, pending
         
-        headers = {
-            'X-Consumer-Client-Id': self.config.client_id,
-            'Authorization': f'Bearer {self.access_token}',
-            'Accept': 'application/json',
-            'User-Agent': 'curl/8.7.1'  # Consistent User-Agent
-        }
+        # One batched lookup for everything the in-memory cache didn't have
+        try:
+            stored = self.result_store.get_many(pending, self.config.results_ttl)
+        except sqlite3.Error as e:
+            logger.debug("Could not read stored results: %s", e)
+            return cached_results, pending
+        
+        remaining = []
+        for credit_number in pending:
+            result = stored.get(credit_number)
+            if result is None:
+                remaining.append(credit_number)
+                continue
+            self._cache_result(credit_number, result, persist=False)
+            cached_results.append({**result, 'from_cache': True})
+        return cached_results, remaining
+    
+    def query_debts(self, credit_numbers: List[str], concurrency: int = 8, delay: float = 0.0,
+                    limiter: Optional[AdaptiveLimiter] = None,
+                    bucket: Optional[TokenBucket] = None) -> Iterator[Dict]:
+        """Query several credit numbers with up to `concurrency` requests in flight, yielding results as they complete
         
+        Requests are paced by a shared token bucket at `concurrency / delay` per second, the rate
+        of every slot waiting `delay` between requests, without idling after slow responses.
+        Callers spanning several calls pass their own `limiter` and `bucket` so the learned rate carries over.
+        """
+        # Authenticate once up front so the workers don't all start by re-authenticating
+        self.ensure_authentication()
+        
+        # Every worker keeps its own kept-alive connection instead of overflowing the pool
+        self._ensure_pool_size(concurrency)
+        
+        # `concurrency` is the ceiling; the limiter finds the rate the server actually accepts
+        if limiter is None:
+            limiter = AdaptiveLimiter(maximum=concurrency, initial=min(concurrency, 8))
+        if bucket is None and delay > 0:
+            bucket = TokenBucket(concurrency / delay, concurrency)
+        
+        def limited_query(credit_number: str) -> Dict:
+            if bucket is not None:
+                bucket.acquire()
+            limiter.acquire()
+            status_code = None
+            try:
+                result = self.query_debt(credit_number)
+                if not result['from_cache']:
+                    status_code = result['status_code']
+            finally:
+                limiter.release(status_code)
+            # A throttled worker backs off after handing its slot back, so the sleep
+            # doesn't also shrink the concurrency the halved limit still allows
+            if not result['from_cache'] and result.get('retry_after'):
+                time.sleep(result['retry_after'])
+            return result
+        
+        # Workers share the session's connection pool, so requests overlap their round trips;
+        # results stream out as they finish, so one slow credit doesn't hold back the rest
+        executor = ThreadPoolExecutor(max_workers=concurrency)
         try:
-            # Log request details
-            log_request(
-                logger,
-                'GET',
-                debt_url,
-                headers=headers
-            )
+            futures = [executor.submit(limited_query, credit_number) for credit_number in credit_numbers]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # A consumer that stops early (an error, Ctrl-C, an abandoned iterator) cancels the
+            # queries still queued; only those already running finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def query_debt_batches(self, credit_numbers: List[str], batch_size: int = 100, batch_interval: float = 1.0,
+                           concurrency: int = 8, delay: float = 0.0) -> Iterator[Dict]:
+        """Query credit numbers in concurrent batches of `batch_size`, pausing `batch_interval` seconds between batches
+        
+        A batch that gets throttled (429/503) halves the size of the next one and doubles the pause.
+        """
+        # One limiter and bucket for the whole run, so each batch starts at the rate the last one reached
+        limiter = AdaptiveLimiter(maximum=concurrency, initial=min(concurrency, 8))
+        bucket = TokenBucket(concurrency / delay, concurrency) if delay > 0 else None
+        
+        start = 0
+        while start < len(credit_numbers):
+            batch = credit_numbers[start:start + batch_size]
+            start += len(batch)
             
-            response = requests.get(debt_url, headers=headers, timeout=self.config.timeout)
+            throttled = False
+            for result in self.query_debts(batch, concurrency, delay, limiter=limiter, bucket=bucket):
+                throttled = (throttled or result['status_code'] in _THROTTLE_STATUSES
+                             or bool(result.get('retry_after')))
+                yield result
             
-            # Log response details
-            log_request(
-                logger,
-                'GET',
-                debt_url,
-                response_status=response.status_code,
-                response_text=response.text
-            )
+            if start >= len(credit_numbers):
+                break
+            if throttled:
+                batch_size = max(1, batch_size // 2)
+                batch_interval = max(batch_interval * 2, _MIN_BATCH_BACKOFF)
+                logger.info(f"⏳ Throttled; next batches of {batch_size} every {batch_interval:.1f}s")
+            time.sleep(batch_interval)
+    
+    def _query_debt_with_retry(self, credit_number: str) -> Dict:
+        """Internal method to query debt with automatic re-authentication"""
+        max_retries = 2
+        
+        formatted_id = self.format_loan_id(credit_number)
+        debt_url = self.config.debt_url(formatted_id)
+        
+        # Auth failures re-run the request after a token refresh, at most max_retries times
+        for retry_count in range(max_retries + 1):
+            if not self.ensure_authentication():
+                logger.error(f"Authentication failed for credit {credit_number}")
+                return {
+                    'credit_number': credit_number,
+                    'status_code': 'AUTH_ERROR',
+                    'error': 'Authentication failed',
+                    'response': None,
+                    'timestamp': _result_timestamp(),
+                    'from_cache': False
+                }
             
-            # Check for authentication errors and retry if needed
-            if response.status_code in [401, 403] and retry_count < max_retries:
-                logger.warning(f"🔄 Authentication error {response.status_code} for {credit_number}, retrying...")
-                logger.info(f"🔑 Re-authenticating (attempt {retry_count + 1}/{max_retries})")
+            headers = self._debt_headers
+            
+            try:
+                # Log request details
+                log_request(
+                    logger,
+                    'GET',
+                    debt_url,
+                    headers=headers
+                )
                 
-                # Force re-authentication
-                self.access_token = None
-                self.token_expires_at = None
+                response = self.session.get(debt_url, headers=headers, timeout=self.config.timeout)
                 
-                if self.authenticate():
-                    logger.info(f"✅ Re-authentication successful, retrying query for {credit_number}")
-                    return self._query_debt_with_retry(credit_number, retry_count + 1)
+                # Log response details; the body is only decoded to text when DEBUG output is on
+                if logger.isEnabledFor(logging.DEBUG):
+                    log_request(
+                        logger,
+                        'GET',
+                        debt_url,
+                        response_status=response.status_code,
+                        response_text=response.text
+                    )
+                
+                # Check for authentication errors and retry if needed
+                if response.status_code in [401, 403] and retry_count < max_retries:
+                    logger.warning(f"🔄 Authentication error {response.status_code} for {credit_number}, retrying...")
+                    logger.info(f"🔑 Re-authenticating (attempt {retry_count + 1}/{max_retries})")
+                    
+                    # Force re-authentication, unless another worker already replaced the rejected token
+                    if self._reauthenticate(headers):
+                        logger.info(f"✅ Re-authentication successful, retrying query for {credit_number}")
+                        continue
+                    else:
+                        logger.error(f"❌ Re-authentication failed for {credit_number}")
+                
+                result = {
+                    'credit_number': credit_number,
+                    'formatted_id': formatted_id,
+                    'status_code': response.status_code,
+                    'error': None,
+                    'response': None,
+                    'timestamp': _result_timestamp(),
+                    'from_cache': False,
+                    'retry_count': retry_count
+                }
+                if response.status_code in _THROTTLE_STATUSES:
+                    result['retry_after'] = _retry_after_seconds(response)
+                
+                if response.status_code == 200:
+                    result['response'] = _parse_json(response)
+                    installments = result['response'].get('listRestInstallmentsPayableResponse', [])
+                    logger.info(f"✅ Successfully queried {credit_number}: {len(installments)} installments")
                 else:
-                    logger.error(f"❌ Re-authentication failed for {credit_number}")
-            
-            result = {
-                'credit_number': credit_number,
-                'formatted_id': formatted_id,
-                'status_code': response.status_code,
-                'error': None,
-                'response': None,
-                'timestamp': datetime.now().isoformat(),
-                'from_cache': False,
-                'retry_count': retry_count
-            }
-            
-            if response.status_code == 200:
-                result['response'] = response.json()
-                installments = result['response'].get('listRestInstallmentsPayableResponse', [])
-                logger.info(f"✅ Successfully queried {credit_number}: {len(installments)} installments")
-            else:
-                logger.warning(f"❌ Failed to query {credit_number}: status {response.status_code}")
-                try:
-                    error_data = response.json()
-                    if 'errors' in error_data:
-                        if isinstance(error_data['errors'], list) and len(error_data['errors']) > 0:
-                            result['error'] = error_data['errors'][0].get('message', 'Unknown error')
-                        elif isinstance(error_data['errors'], dict):
-                            result['error'] = error_data['errors'].get('message', 'Unknown error')
+                    logger.warning(f"❌ Failed to query {credit_number}: status {response.status_code}")
+                    try:
+                        error_data = _parse_json(response)
+                        if 'errors' in error_data:
+                            if isinstance(error_data['errors'], list) and len(error_data['errors']) > 0:
+                                result['error'] = error_data['errors'][0].get('message', 'Unknown error')
+                            elif isinstance(error_data['errors'], dict):
+                                result['error'] = error_data['errors'].get('message', 'Unknown error')
+                            else:
+                                result['error'] = str(error_data['errors'])
                         else:
-                            result['error'] = str(error_data['errors'])
-                    else:
+                            result['error'] = response.text
+                        logger.error(f"Error details for {credit_number}: {result['error']}")
+                    except json.JSONDecodeError:
                         result['error'] = response.text
-                    logger.error(f"Error details for {credit_number}: {result['error']}")
-                except json.JSONDecodeError:
-                    result['error'] = response.text
-                    logger.error(f"Raw error response for {credit_number}: {response.text}")
-            
-            # Cache the result (successful or failed)
-            self.response_cache[credit_number] = result.copy()
-            logger.debug(f"Cached response for {credit_number}")
-            
-            return result
-            
-        except requests.exceptions.Timeout:
-            logger.error(f"Timeout querying {credit_number}")
-            result = {
-                'credit_number': credit_number,
-                'formatted_id': formatted_id,
-                'status_code': 'TIMEOUT',
-                'error': 'Request timeout',
-                'response': None,
-                'timestamp': datetime.now().isoformat(),
-                'from_cache': False,
-                'retry_count': retry_count
-            }
-            # Cache timeout results too
-            self.response_cache[credit_number] = result.copy()
-            return result
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Connection error querying {credit_number}: {e}")
-            result = {
-                'credit_number': credit_number,
-                'formatted_id': formatted_id,
-                'status_code': 'CONNECTION_ERROR',
-                'error': str(e),
-                'response': None,
-                'timestamp': datetime.now().isoformat(),
-                'from_cache': False,
-                'retry_count': retry_count
-            }
-            # Cache connection errors too
-            self.response_cache[credit_number] = result.copy()
-            return result
+                        logger.error(f"Raw error response for {credit_number}: {response.text}")
+                
+                # Cache the result (successful or failed)
+                self._cache_result(credit_number, result)
+                logger.debug("Cached response for %s", credit_number)
+                
+                return result
+                
+            except requests.exceptions.Timeout:
+                logger.error(f"Timeout querying {credit_number}")
+                result = {
+                    'credit_number': credit_number,
+                    'formatted_id': formatted_id,
+                    'status_code': 'TIMEOUT',
+                    'error': 'Request timeout',
+                    'response': None,
+                    'timestamp': _result_timestamp(),
+                    'from_cache': False,
+                    'retry_count': retry_count
+                }
+                # Cache timeout results too
+                self._cache_result(credit_number, result)
+                return result
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Connection error querying {credit_number}: {e}")
+                result = {
+                    'credit_number': credit_number,
+                    'formatted_id': formatted_id,
+                    'status_code': 'CONNECTION_ERROR',
+                    'error': str(e),
+                    'response': None,
+                    'timestamp': _result_timestamp(),
+                    'from_cache': False,
+                    'retry_count': retry_count
+                }
+                # Cache connection errors too
+                self._cache_result(credit_number, result)
+                return result
 
 
 def get_processing_subset(credit_numbers: List[str]) -> List[str]:
@@ -476,8 +1056,18 @@ def get_processing_subset(credit_numbers: List[str]) -> List[str]:
     return []
 
 
-def extract_credit_numbers_from_csv_with_selection(csv_file: str) -> Tuple[List[str], List[Dict]]:
-    """Extract credit numbers from CSV with column selection and return original data"""
+def _classify_column(column: str) -> str:
+    """How likely a column is to hold credit codes: 'strong', 'weak' or 'plain'"""
+    column_lower = column.lower()
+    if any(keyword in column_lower for keyword in _CREDIT_COLUMN_KEYWORDS):
+        return 'strong'
+    if any(keyword in column_lower for keyword in _NUMBER_COLUMN_KEYWORDS):
+        return 'weak'
+    return 'plain'
+
+
+def extract_credit_numbers_from_csv_with_selection(csv_file: str) -> Tuple[List[str], List[Dict], Optional[str]]:
+    """Extract credit numbers from CSV with column selection and return original data and the selected column"""
     print("📋 Analyzing CSV structure...")
     
     # First, read CSV to show available columns
@@ -485,87 +1075,72 @@ def extract_credit_numbers_from_csv_with_selection(csv_file: str) -> Tuple[List[
         with open(csv_file, 'r', encoding='utf-8') as f:
             # Try different delimiters
             sample = f.read(1024)
-            f.seek(0)
-            
+        
+        # The sniffer understands quoting; plain counting is the fallback for samples it can't decide
+        try:
+            delimiter = csv.Sniffer().sniff(sample, delimiters=';,').delimiter
+        except csv.Error:
             delimiter = ';' if sample.count(';') > sample.count(',') else ','
-            reader = csv.DictReader(f, delimiter=delimiter)
-            
-            # Get column names
-            columns = reader.fieldnames
-            if not columns:
-                print("❌ Could not read CSV columns")
-                return [], []
-            
-            print(f"\n📊 Available columns in CSV:")
-            for i, col in enumerate(columns, 1):
-                # Highlight potential credit code columns
-                if any(keyword in col.lower() for keyword in ['credit', 'codigo', 'ident', 'loan', 'credito']):
-                    print(f"   {i}. {col} ⭐ (Potential credit code column)")
-                elif any(keyword in col.lower() for keyword in ['numero', 'number', 'num', 'id']):
-                    print(f"   {i}. {col} ✓ (May contain credit codes)")
-                else:
-                    print(f"   {i}. {col}")
-            
-            print(f"\n💡 Credit codes should be 12-digit numbers (API requires 00350001 + 12 digits)")
-            
-            # Let user select code column using interactive menu
-            column_options = []
-            for i, col in enumerate(columns):
-                # Create description based on column type
-                if any(keyword in col.lower() for keyword in ['credit', 'codigo', 'ident', 'loan', 'credito']):
-                    description = "⭐ Potential credit code column"
-                elif any(keyword in col.lower() for keyword in ['numero', 'number', 'num', 'id']):
-                    description = "✓ May contain credit codes"
-                else:
-                    description = "Regular column"
-                
-                column_options.append({
-                    'name': col,
-                    'value': col,
-                    'description': description
-                })
-            
-            # Add cancel option
+        
+        # Get column names from the header alone, exactly as written (duplicates included)
+        with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+            columns = next(csv.reader(f, delimiter=delimiter), [])
+        if not columns:
+            print("❌ Could not read CSV columns")
+            return [], [], None
+        
+        # Each column is classified once and feeds both the printed list and the menu
+        print(f"\n📊 Available columns in CSV:")
+        column_options = []
+        for i, col in enumerate(columns, 1):
+            suffix, description = _COLUMN_HINTS[_classify_column(col)]
+            print(f"   {i}. {col}{suffix}")
             column_options.append({
-                'name': '❌ Cancel',
-                'value': None,
-                'description': 'Cancel column selection'
+                'name': col,
+                'value': col,
+                'description': description
             })
-            
-            selected_option = interactive_menu("Select column for credit codes:", column_options)
-            if not selected_option or selected_option['value'] is None:
-                return [], []
-            
-            selected_column = selected_option['value']
-            print(f"✅ Selected column: {selected_column}")
-            
-            # Read all data
-            f.seek(0)
-            reader = csv.DictReader(f, delimiter=delimiter)
-            original_data = list(reader)
-            
-            # Extract credit numbers from selected column
-            credit_numbers = []
-            for row in original_data:
-                credit_code = row.get(selected_column, '').strip()
-                if credit_code and credit_code.isdigit() and len(credit_code) >= 10:
-                    credit_numbers.append(credit_code)
-            
-            # Remove duplicates while preserving order
-            unique_credits = []
-            seen = set()
-            for credit in credit_numbers:
-                if credit not in seen:
-                    unique_credits.append(credit)
-                    seen.add(credit)
-            
-            print(f"📊 Extracted {len(unique_credits)} unique credit numbers")
-            return unique_credits, original_data
-            
+        
+        print(f"\n💡 Credit codes should be 12-digit numbers (API requires 00350001 + 12 digits)")
+        
+        # Add cancel option
+        column_options.append({
+            'name': '❌ Cancel',
+            'value': None,
+            'description': 'Cancel column selection'
+        })
+        
+        selected_option = interactive_menu("Select column for credit codes:", column_options)
+        if not selected_option or selected_option['value'] is None:
+            return [], [], None
+        
+        selected_column = selected_option['value']
+        print(f"✅ Selected column: {selected_column}")
+        
+        # Read all data, keeping every value as the original string. Rows are keyed by the header
+        # like csv.DictReader (a repeated column keeps its last value); fields past the header are
+        # dropped and missing ones read as '', so ragged rows never shift or break the columns
+        width = len(columns)
+        padding = [''] * width
+        with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f, delimiter=delimiter)
+            next(reader, None)
+            original_data = [dict(zip(columns, row + padding[len(row):])) for row in reader if row]
+        
+        # Extract credit numbers from selected column; dict keys drop duplicates while preserving order
+        unique_credits = {}
+        for row in original_data:
+            credit_code = row[selected_column].strip()
+            if credit_code.isdigit() and len(credit_code) >= 10:
+                unique_credits[credit_code] = None
+        unique_credits = list(unique_credits)
+        
+        print(f"📊 Extracted {len(unique_credits)} unique credit numbers")
+        return unique_credits, original_data, selected_column
+        
     except Exception as e:
         print(f"❌ Error reading CSV: {e}")
-        return [], []
-
+        return [], [], None
 
 def main():
     print("🏦 Consumer API Debt Checker")
@@ -587,13 +1162,23 @@ def main():
                 'client_secret': 'YOUR_CLIENT_SECRET_HERE',
                 'timeout': 30,
                 'scope': 'Internet_Clientes_Persona',
-                'oauth_type': 'iam-scf'
+                'oauth_type': 'iam-scf',
+                'max_retries': 3,
+                'retry_backoff': 0.5
             },
             'processing': {
                 'default_delay': 1.0,
                 'max_delay': 10.0,
                 'min_delay': 0.1,
-                'batch_size': 100
+                'batch_size': 100,
+                'batch_interval': 0.0,
+                'concurrency': 1
+            },
+            'cache': {
+                'max_entries': 10000,
+                'negative_ttl_seconds': 300,
+                'persist_token': False,
+                'results_ttl_seconds': 0
             },
             'logging': {
                 'level': 'DEBUG',
@@ -627,7 +1212,7 @@ def main():
     
     # Set logging level from config
     log_level = config.get('logging', {}).get('level', 'INFO')
-    logger.setLevel(getattr(__import__('logging'), log_level))
+    logger.setLevel(getattr(logging, log_level))
     
     logger.info("Starting Consumer Debt Checker application")
     
@@ -639,8 +1224,8 @@ def main():
     consumer_config = ConsumerAPIConfig.from_config(config)
     api_client = ConsumerAPI(consumer_config)
     
-    # Test authentication
-    if not api_client.authenticate():
+    # Test authentication, unless a saved token is still valid
+    if not api_client.authenticate_if_needed():
         print("❌ Failed to authenticate with Consumer API")
         print("💡 Please check your credentials and network connection")
         print("🔧 You can test the connection manually with option '🧪 Test API connection'")
@@ -648,6 +1233,7 @@ def main():
         
         if not confirm("Continue without authentication?", default=False):
             print("👋 Goodbye!")
+            api_client.close()
             return
         
         print("⚠️  Continuing without authentication - some features may fail")
@@ -710,6 +1296,8 @@ def main():
             print(f"❌ Error: {e}")
             if not confirm("Would you like to continue?", default=True):
                 break
+    
+    api_client.close()
 
 
 def query_single_credit(config=None, api_client=None):
@@ -749,7 +1337,7 @@ def query_single_credit(config=None, api_client=None):
         
         # Authenticate
         print("\n🔐 Authenticating with Consumer API...")
-        if not api.authenticate():
+        if not api.authenticate_if_needed():
             print("❌ Authentication failed")
             return
         
@@ -833,7 +1421,7 @@ def process_csv_file(config=None, api_client=None):
     
     # Extract credit numbers from CSV
     print("\n🔍 Analyzing CSV file...")
-    credit_numbers, original_data = extract_credit_numbers_from_csv_with_selection(csv_file)
+    credit_numbers, original_data, credit_column = extract_credit_numbers_from_csv_with_selection(csv_file)
     
     if not credit_numbers:
         print("❌ No valid credit numbers found in CSV")
@@ -857,6 +1445,10 @@ def process_csv_file(config=None, api_client=None):
         return
     
     # Get processing options
+    processing_config = config.get('processing', {})
+    concurrency = max(1, int(processing_config.get('concurrency', 1)))
+    batch_size = max(1, int(processing_config.get('batch_size', 100)))
+    batch_interval = float(processing_config.get('batch_interval', 0.0))
     delay = get_delay_setting(config)
     
     # Use passed API client or create new one
@@ -866,7 +1458,7 @@ def process_csv_file(config=None, api_client=None):
         
         # Authenticate
         print("\n🔐 Authenticating with Consumer API...")
-        if not api.authenticate():
+        if not api.authenticate_if_needed():
             print("❌ Authentication failed")
             return
         
@@ -879,34 +1471,76 @@ def process_csv_file(config=None, api_client=None):
     print(f"\n🔄 Processing {len(credit_numbers)} credits...")
     print("=" * 50)
     
-    results = []
-    successful_count = 0
+    # Credits answered by the cache or an earlier run need no request
+    results, credit_numbers = api.split_cached(credit_numbers)
+    successful_count = sum(1 for result in results if result['status_code'] == 200)
+    if results:
+        print(f"♻️  {len(results)} credits answered from cache ({successful_count} successful)")
     
-    for i, credit_number in enumerate(credit_numbers, 1):
-        print(f"\n[{i}/{len(credit_numbers)}] Processing {credit_number}...")
-        
-        result = api.query_debt(credit_number)
-        results.append(result)
-        
-        # Show result
-        if result['status_code'] == 200:
-            installments = result.get('response', {}).get('listRestInstallmentsPayableResponse', [])
-            print(f"✅ Success ({len(installments)} installments)")
-            successful_count += 1
+    # Output rows are built as results arrive, overlapping with the requests still in flight
+    csv_rows = ResultsCSVBuilder(api, original_data, credit_column)
+    for result in results:
+        csv_rows.add(result)
+    
+    # With concurrency enabled, results are fetched ahead and reported as they complete
+    concurrent_results = None
+    if concurrency > 1 and credit_numbers:
+        print(f"⚡ Running up to {concurrency} queries at a time")
+        if batch_interval > 0:
+            # Batches with a pause in between, for APIs that limit requests per time window
+            print(f"📦 In batches of {batch_size}, {batch_interval}s apart")
+            concurrent_results = api.query_debt_batches(credit_numbers, batch_size, batch_interval, concurrency, delay)
         else:
-            error_category = api.categorize_error(result.get('error', ''))
-            print(f"❌ Error: {error_category}")
-        
-        # Delay between requests
-        if i < len(credit_numbers):
-            time.sleep(delay)
+            concurrent_results = api.query_debts(credit_numbers, concurrency, delay)
+    
+    # Sequential requests are paced by a token bucket rather than a sleep after each one;
+    # a capacity of one starts every request at least `delay` after the previous one started
+    bucket = None
+    if concurrent_results is None and delay > 0:
+        bucket = TokenBucket(1 / delay)
+    
+    # One write per credit; the progress and status lines go out together
+    write = sys.stdout.write
+    total = len(credit_numbers)
+    try:
+        for i, credit_number in enumerate(credit_numbers, 1):
+            if concurrent_results is None:
+                # Shown before the request, so a slow credit is visible while it runs
+                write(f"\n[{i}/{total}] Processing {credit_number}...\n")
+                if bucket is not None:
+                    bucket.acquire()
+                result = api.query_debt(credit_number)
+                progress = ""
+            else:
+                result = next(concurrent_results)
+                progress = f"\n[{i}/{total}] Processed {result['credit_number']}\n"
+            results.append(result)
+            csv_rows.add(result)
+            
+            # Show result
+            if result['status_code'] == 200:
+                installments = result.get('response', {}).get('listRestInstallmentsPayableResponse', [])
+                write(f"{progress}✅ Success ({len(installments)} installments)\n")
+                successful_count += 1
+            else:
+                error_category = api.categorize_error(result.get('error', ''))
+                write(f"{progress}❌ Error: {error_category}\n")
+            
+            # Throttled responses aren't retried by the transport; back off before the next request
+            if concurrent_results is None and not result['from_cache'] and result.get('retry_after'):
+                time.sleep(result['retry_after'])
+    finally:
+        # Stopping early (an error, Ctrl-C) cancels the concurrent queries still queued
+        if concurrent_results is not None:
+            concurrent_results.close()
     
     # Generate output file
     print(f"\n📤 Generating results file...")
-    output_file = generate_results_csv(results, api, original_data)
+    output_file = results_output_path()
+    csv_rows.write(output_file)
     
     # Show summary
-    print_processing_summary(results, successful_count, output_file)
+    print_processing_summary(results, successful_count, output_file, api)
 
 
 def browse_for_csv_file() -> Optional[str]:
@@ -927,27 +1561,27 @@ def browse_for_csv_file() -> Optional[str]:
             })
         
         try:
-            entries = sorted(os.listdir(current_dir))
+            # One directory read; DirEntry knows each entry's type without a stat per check
+            with os.scandir(current_dir) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
             
             # Add directories
             for entry in entries:
-                full_path = os.path.join(current_dir, entry)
-                if os.path.isdir(full_path):
+                if entry.is_dir():
                     items.append({
-                        'name': f'📁 {entry}',
-                        'value': entry,
+                        'name': f'📁 {entry.name}',
+                        'value': entry.name,
                         'description': 'Directory',
                         'type': 'dir'
                     })
             
             # Add CSV files
             for entry in entries:
-                full_path = os.path.join(current_dir, entry)
-                if os.path.isfile(full_path) and entry.lower().endswith('.csv'):
-                    file_size = get_file_size_str(os.path.getsize(full_path))
+                if entry.name.lower().endswith('.csv') and entry.is_file():
+                    file_size = get_file_size_str(entry.stat().st_size)
                     items.append({
-                        'name': f'📄 {entry}',
-                        'value': entry,
+                        'name': f'📄 {entry.name}',
+                        'value': entry.name,
                         'description': f'CSV File ({file_size})',
                         'type': 'file'
                     })
@@ -1019,48 +1653,82 @@ def extract_credit_numbers_from_csv(csv_file: str) -> List[str]:
     logger.info(f"Extracting credit numbers from CSV: {csv_file}")
     logger.debug(f"Using delimiter: {default_delimiter} (fallback: {fallback_delimiter})")
     
-    credit_numbers = set()
+    # Dict keys keep the order of first appearance while dropping duplicates
+    credit_numbers = {}
     
     try:
-        with open(csv_file, 'r', encoding='utf-8') as file:
-            # Detect delimiter
-            sample = file.read(1024)
-            file.seek(0)
-            if default_delimiter in sample:
-                delimiter = default_delimiter
-            elif fallback_delimiter in sample:
-                delimiter = fallback_delimiter
-            else:
-                delimiter = default_delimiter
+        with open(csv_file, 'r', encoding='utf-8', newline='') as file:
+            # Detect delimiter; the sniffer understands quoting, plain presence is the fallback
+            sample = file.read(8192)
+            file.seek(0)  # The only rewind; everything after reads forward
+            try:
+                delimiter = csv.Sniffer().sniff(sample, delimiters=default_delimiter + fallback_delimiter).delimiter
+            except csv.Error:
+                if default_delimiter in sample:
+                    delimiter = default_delimiter
+                elif fallback_delimiter in sample:
+                    delimiter = fallback_delimiter
+                else:
+                    delimiter = default_delimiter
                 
             logger.debug(f"Detected delimiter: '{delimiter}'")
             
-            # Check for header
-            first_line = file.readline().strip()
-            file.seek(0)
+            add = credit_numbers.setdefault
+            isdigit = str.isdigit
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
+            
+            def collect(rows, type_index: int, credit_index: int, first_row_num: int):
+                """Row-by-row filter, for headerless files and exports pandas can't parse"""
+                min_columns = max(type_index, credit_index) + 1
+                for row_num, row in enumerate(rows, first_row_num):
+                    if len(row) >= min_columns and row[type_index] == debt_record_type:
+                        credit_number = row[credit_index].strip()
+                        if isdigit(credit_number) and len(credit_number) >= min_credit_length:
+                            add(credit_number)
+                            if debug_enabled:
+                                logger.debug("Found credit number at row %d: %s", row_num, credit_number)
             
-            if credit_number_column in first_line:
-                # Has header
+            reader = csv.reader(file, delimiter=delimiter)
+            first_row = next(reader, [])
+            header = [column.strip() for column in first_row]
+            
+            # Check for header
+            if credit_number_column in header:
                 logger.debug("CSV has header row")
-                reader = csv.DictReader(file, delimiter=delimiter)
-                for row_num, row in enumerate(reader, 2):  # Start from 2 (after header)
-                    if row.get('RECORD_TYPE') == debt_record_type:
-                        credit_number = row.get(credit_number_column, '').strip()
-                        if credit_number and credit_number.isdigit() and len(credit_number) >= min_credit_length:
-                            credit_numbers.add(credit_number)
-                            logger.debug(f"Found credit number at row {row_num}: {credit_number}")
+                if 'RECORD_TYPE' in header:
+                    type_index = header.index('RECORD_TYPE')
+                    credit_index = header.index(credit_number_column)
+                    try:
+                        # Large exports are filtered in vectorized chunks, reading only the two columns
+                        # needed; pandas continues right after the header row the reader already consumed.
+                        # index_col=False keeps rows with extra fields (a trailing delimiter) aligned
+                        chunks = pd.read_csv(
+                            file, sep=delimiter, dtype=str, keep_default_na=False,
+                            header=None, names=list(range(len(first_row))), index_col=False,
+                            usecols=[type_index, credit_index], chunksize=_CSV_CHUNK_ROWS,
+                            engine='c'
+                        )
+                        # usecols keeps file order, so the two columns come back sorted by position
+                        type_pos = 0 if type_index < credit_index else 1
+                        for chunk in chunks:
+                            record_types = chunk.iloc[:, type_pos]
+                            credits = chunk.iloc[:, 1 - type_pos].str.strip()
+                            mask = (record_types == debt_record_type) & credits.str.isdigit() \
+                                & (credits.str.len() >= min_credit_length)
+                            credit_numbers.update(dict.fromkeys(credits[mask]))
+                    except (pd.errors.ParserError, ValueError) as e:
+                        # Rows already collected keep their place; the rescan only adds what's missing
+                        logger.debug(f"Chunked read failed ({e}), reading row by row")
+                        file.seek(0)
+                        reader = csv.reader(file, delimiter=delimiter)
+                        next(reader, None)
+                        collect(reader, type_index, credit_index, 2)
             else:
                 # No header, use positions
                 logger.debug("CSV has no header, using positions")
-                file.seek(0)
-                reader = csv.reader(file, delimiter=delimiter)
-                for row_num, row in enumerate(reader, 1):
-                    if len(row) > 8 and row[0] == debt_record_type:
-                        credit_number = row[8].strip()
-                        if credit_number and credit_number.isdigit() and len(credit_number) >= min_credit_length:
-                            credit_numbers.add(credit_number)
-                            logger.debug(f"Found credit number at row {row_num}: {credit_number}")
+                collect(chain((first_row,), reader), 0, 8, 1)
         
+        credit_numbers = list(credit_numbers)
         logger.info(f"Extracted {len(credit_numbers)} unique credit numbers")
         
     except Exception as e:
@@ -1068,7 +1736,7 @@ def extract_credit_numbers_from_csv(csv_file: str) -> List[str]:
         print(f"❌ Error reading CSV: {e}")
         return []
     
-    return list(credit_numbers)
+    return credit_numbers
 
 
 def get_delay_setting(config: Dict) -> float:
@@ -1087,158 +1755,184 @@ def get_delay_setting(config: Dict) -> float:
         return default_delay
 
 
-def generate_results_csv(results: List[Dict], api: ConsumerAPI, original_data: List[Dict] = None) -> str:
-    """Generate CSV file with results ordered by: http_code > codigo > rut > response > original"""
-    # Generate output filename with date
-    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    filename = f"consumer_debt_results_{timestamp}.csv"
-    
-    # Use OutputManager to create path: output/consumer_debt_checker/filename
-    output_manager = OutputManager()
-    output_file = output_manager.get_output_path('consumer_debt_checker', filename, subfolder="")
-    
-    # Create index of original data by credit number
-    original_index = {}
-    if original_data:
-        for row in original_data:
-            # Find credit number in any column
-            for key, value in row.items():
-                if str(value).strip().isdigit() and len(str(value).strip()) >= 10:
-                    credit_num = str(value).strip()
-                    if credit_num not in original_index:
-                        original_index[credit_num] = row
-                    break
-    
-    # Sort results by: http_code > codigo > rut 
-    def sort_key(result):
-        status_code = str(result['status_code'])
-        credit_number = result['credit_number']
+class ResultsCSVBuilder:
+    """Rows of the results CSV, built as query results arrive and written sorted at the end"""
+    
+    # Column order: http_code > codigo > rut > response > original
+    PRIORITY_FIELDS = ['http_code', 'codigo', 'rut']
+    RESPONSE_FIELDS = ['error_category', 'error_message', 'installments_count', 
+                       'total_debt_clp', 'first_due_date', 'last_due_date', 
+                       'installment_details', 'metadata_status', 'formatted_loan_id', 'timestamp', 'from_cache']
+    
+    def __init__(self, api: ConsumerAPI, original_data: List[Dict] = None, credit_column: str = None):
+        self.api = api
+        self.rows = []  # (sort key, row) pairs; responses aren't kept once their row is built
         
-        # Extract RUT if available in original data
-        rut = ""
-        if credit_number in original_index:
-            original_row = original_index[credit_number]
-            # Look for RUT-like fields
-            for key, value in original_row.items():
-                key_lower = key.lower()
-                if 'rut' in key_lower or 'dni' in key_lower or 'id' in key_lower:
-                    rut = str(value).strip()
-                    break
+        # Original columns are the same for every row, so the RUT and credit columns are found once
+        original_columns = list(original_data[0].keys()) if original_data else []
+        self.rut_col = next((col for col in original_columns
+                             if 'rut' in col.lower() or 'dni' in col.lower() or 'id' in col.lower()), None)
+        if credit_column in original_columns:
+            # The column the credits were read from indexes the rows directly
+            self.original_index = {}
+            for row in original_data:
+                credit_num = row[credit_column].strip()
+                if credit_num and credit_num not in self.original_index:
+                    self.original_index[credit_num] = row
+        else:
+            self.original_index = self._index_original_data(original_data, original_columns)
         
-        return (status_code, rut, credit_number)
-    
-    results.sort(key=sort_key)
-    
-    # Write CSV with new column order: http_code > codigo > rut > response > original
-    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        # Add original CSV columns (if available), avoiding duplicates
+        self.fieldnames = self.PRIORITY_FIELDS + self.RESPONSE_FIELDS
+        self.extra_columns = [col for col in original_columns if col not in self.fieldnames]
+        self.fieldnames = self.fieldnames + self.extra_columns
         
-        # Build fieldnames in the required order
-        fieldnames = ['http_code', 'codigo', 'rut']  # Priority columns first
+        # Original values replace priority columns of the same name; response fields always win
+        self.priority_overrides = [i for i, col in enumerate(self.PRIORITY_FIELDS) if col in original_columns]
+    
+    @staticmethod
+    def _index_original_data(original_data: Optional[List[Dict]], original_columns: List[str]) -> Dict[str, Dict]:
+        """Index original rows by the first credit-like value in each, keeping the first row of each credit"""
+        def find_credit(row):
+            """First value in the row that looks like a credit number"""
+            for value in row.values():
+                value = str(value).strip()
+                if value.isdigit() and len(value) >= 10:
+                    return value
+            return None
         
-        # Add response fields
-        response_fields = ['error_category', 'error_message', 'installments_count', 
-                          'total_debt_clp', 'first_due_date', 'last_due_date', 
-                          'installment_details', 'metadata_status', 'formatted_loan_id', 'timestamp', 'from_cache']
-        fieldnames.extend(response_fields)
+        original_index = {}
+        if not original_data:
+            return original_index
         
-        # Add original CSV columns (if available)
-        original_columns = []
-        if original_data and len(original_data) > 0:
-            original_columns = list(original_data[0].keys())
-            # Avoid duplicates
-            for col in original_columns:
-                if col not in fieldnames:
-                    fieldnames.append(col)
+        first_credit = find_credit(original_data[0])
+        credit_col = next((col for col in original_columns
+                           if str(original_data[0][col]).strip() == first_credit), None)
+        for row in original_data:
+            credit_num = str(row.get(credit_col, '')).strip()
+            if not (credit_num.isdigit() and len(credit_num) >= 10):
+                # Rare row whose credit number sits elsewhere
+                credit_num = find_credit(row)
+                if credit_num is None:
+                    continue
+            if credit_num not in original_index:
+                original_index[credit_num] = row
+        return original_index
+    
+    def add(self, result: Dict):
+        """Build the CSV row for one query result"""
+        credit_number = result['credit_number']
+        original_row = self.original_index.get(credit_number)
+        rut = str(original_row.get(self.rut_col, '')).strip() if original_row and self.rut_col else ''
         
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
+        # Priority columns
+        priority = [result['status_code'], credit_number, rut]
+        if original_row:
+            for i in self.priority_overrides:
+                priority[i] = original_row.get(self.PRIORITY_FIELDS[i], '')
         
-        for result in results:
-            credit_number = result['credit_number']
-            
-            # Priority columns
-            row = {
-                'http_code': result['status_code'],
-                'codigo': credit_number,
-                'rut': ''
-            }
+        # Response fields
+        error = result.get('error', '')
+        installments_count = ''
+        total_debt_clp = ''
+        first_due_date = ''
+        last_due_date = ''
+        installment_details_str = ''
+        metadata_status = ''
+        
+        # Process successful responses
+        if result['status_code'] == 200 and result.get('response'):
+            installments = result['response'].get('listRestInstallmentsPayableResponse', [])
+            metadata = result['response'].get('_metadata_', [])
             
-            # Extract RUT and original data
-            original_row = original_index.get(credit_number, {})
-            if original_row:
-                # Find RUT
-                for key, value in original_row.items():
-                    key_lower = key.lower()
-                    if 'rut' in key_lower or 'dni' in key_lower or 'id' in key_lower:
-                        row['rut'] = str(value).strip()
-                        break
+            if installments:
+                installments_count = len(installments)
                 
-                # Add all original CSV columns
-                for col in original_columns:
-                    if col in original_row:
-                        row[col] = original_row[col]
-            
-            # Response fields
-            row.update({
-                'error_category': api.categorize_error(result.get('error', '')) if result.get('error') else '',
-                'error_message': result.get('error', ''),
-                'installments_count': '',
-                'total_debt_clp': '',
-                'first_due_date': '',
-                'last_due_date': '',
-                'installment_details': '',
-                'metadata_status': '',
-                'formatted_loan_id': result.get('formatted_id', ''),
-                'timestamp': result['timestamp'],
-                'from_cache': result.get('from_cache', False)
-            })
-            
-            # Process successful responses
-            if result['status_code'] == 200 and result.get('response'):
-                installments = result['response'].get('listRestInstallmentsPayableResponse', [])
-                metadata = result['response'].get('_metadata_', [])
+                # Parallel columns, each built by one comprehension, instead of one loop doing everything
+                parse_amount = self.api.parse_amount
+                amounts = [parse_amount(inst.get('totalAmountReceipt', '0')) for inst in installments]
+                receipt_nums = [inst.get('receipNumber', 'N/A') for inst in installments]
+                dates = [inst.get('receiptSettlementDate', 'N/A') for inst in installments]
                 
-                if installments:
-                    row['installments_count'] = len(installments)
-                    
-                    total_debt = 0.0
-                    installment_details = []
-                    dates = []
-                    
-                    for inst in installments:
-                        amount = api.parse_amount(inst.get('totalAmountReceipt', '0'))
-                        total_debt += amount
-                        
-                        receipt_num = inst.get('receipNumber', 'N/A')
-                        due_date = inst.get('receiptSettlementDate', 'N/A')
-                        dates.append(due_date)
-                        
-                        installment_details.append(f"#{receipt_num}:${amount:,.0f}({due_date})")
-                    
-                    row['total_debt_clp'] = f"{total_debt:,.0f}"
-                    row['installment_details'] = " | ".join(installment_details)
-                    
-                    if dates:
-                        valid_dates = [d for d in dates if d != 'N/A']
-                        if valid_dates:
-                            row['first_due_date'] = min(valid_dates)
-                            row['last_due_date'] = max(valid_dates)
+                # fsum adds the amounts exactly, so the total doesn't drift with the number of installments
+                total_debt_clp = f"{math.fsum(amounts):,.0f}"
+                installment_details_str = " | ".join(
+                    f"#{receipt_num}:${amount:,.0f}({due_date})"
+                    for receipt_num, amount, due_date in zip(receipt_nums, amounts, dates)
+                )
                 
-                if metadata:
-                    metadata_info = []
-                    for meta in metadata:
-                        if isinstance(meta, dict):
-                            code = meta.get('code', 'N/A')
-                            meta_type = meta.get('type', 'N/A')
-                            metadata_info.append(f"{code}:{meta_type}")
-                    row['metadata_status'] = " | ".join(metadata_info)
+                if dates:
+                    valid_dates = [d for d in dates if d != 'N/A']
+                    if valid_dates:
+                        first_due_date = min(valid_dates)
+                        last_due_date = max(valid_dates)
             
-            writer.writerow(row)
+            if metadata:
+                metadata_info = []
+                for meta in metadata:
+                    if isinstance(meta, dict):
+                        code = meta.get('code', 'N/A')
+                        meta_type = meta.get('type', 'N/A')
+                        metadata_info.append(f"{code}:{meta_type}")
+                metadata_status = " | ".join(metadata_info)
+        
+        row = priority + [
+            self.api.categorize_error(error) if error else '',
+            error,
+            installments_count,
+            total_debt_clp,
+            first_due_date,
+            last_due_date,
+            installment_details_str,
+            metadata_status,
+            result.get('formatted_id', ''),
+            result['timestamp'],
+            result.get('from_cache', False)
+        ]
+        
+        # Add all original CSV columns
+        if original_row:
+            row.extend([original_row.get(col, '') for col in self.extra_columns])
+        else:
+            row.extend([''] * len(self.extra_columns))
+        
+        # Sort results by: http_code > codigo > rut 
+        self.rows.append(((str(result['status_code']), rut, credit_number), row))
+    
+    def write(self, output_file: str):
+        """Write the header and every row, ordered by http_code, rut and credit number"""
+        self.rows.sort(key=lambda entry: entry[0])
+        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(self.fieldnames)
+            writer.writerows(row for _, row in self.rows)
+
+
+def results_output_path() -> str:
+    """Path for a new results file, named with the current date and time"""
+    # Generate output filename with date
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    filename = f"consumer_debt_results_{timestamp}.csv"
+    
+    # Use OutputManager to create path: output/consumer_debt_checker/filename
+    output_manager = OutputManager()
+    return output_manager.get_output_path('consumer_debt_checker', filename, subfolder="")
+
+
+def generate_results_csv(results: List[Dict], api: ConsumerAPI, original_data: List[Dict] = None,
+                         credit_column: str = None) -> str:
+    """Generate CSV file with results ordered by: http_code > codigo > rut > response > original"""
+    output_file = results_output_path()
+    
+    builder = ResultsCSVBuilder(api, original_data, credit_column)
+    for result in results:
+        builder.add(result)
+    builder.write(output_file)
     
     return output_file
 
 
-def print_processing_summary(results: List[Dict], successful_count: int, output_file: str):
+def print_processing_summary(results: List[Dict], successful_count: int, output_file: str, api: ConsumerAPI):
     """Print processing summary"""
     print("\n" + "=" * 60)
     print("📊 PROCESSING SUMMARY")
@@ -1257,38 +1951,19 @@ def print_processing_summary(results: List[Dict], successful_count: int, output_
     print(f"📈 Success rate: {success_rate:.1f}%")
     
     # Status code breakdown
-    status_counts = {}
-    error_categories = {}
+    status_counts = Counter(str(result['status_code']) for result in results)
+    error_categories = Counter()
     total_debt = 0.0
     total_installments = 0
     
     for result in results:
-        status = str(result['status_code'])
-        status_counts[status] = status_counts.get(status, 0) + 1
-        
         if result['status_code'] == 200 and result.get('response'):
             installments = result['response'].get('listRestInstallmentsPayableResponse', [])
             total_installments += len(installments)
-            
-            for inst in installments:
-                amount_str = inst.get('totalAmountReceipt', '0')
-                if amount_str.isdigit():
-                    total_debt += int(amount_str) / 10000.0
+            total_debt += math.fsum(api.parse_amount(inst.get('totalAmountReceipt', '0')) for inst in installments)
         elif result.get('error'):
-            category = "UNKNOWN"
-            error_upper = result['error'].upper()
-            if "NO SE PUDO VALIDAR OPERACION" in error_upper:
-                category = "NO_VALIDAR_OPERACION"
-            elif "REVISAR SITUACION" in error_upper:
-                category = "REVISAR_SITUACION"
-            elif "APLICACION" in error_upper:
-                category = "APLICACION_DESACTIVA"
-            elif "CONTEXTO" in error_upper:
-                category = "REINTENTAR_CONTEXTO"
-            elif "UNAUTHORIZED" in error_upper:
-                category = "TOKEN_INVALIDO"
-            
-            error_categories[category] = error_categories.get(category, 0) + 1
+            error_categories[_match_error_category(result['error'], _SUMMARY_ERROR_RE,
+                                                   _SUMMARY_ERROR_CATEGORIES, "UNKNOWN")] += 1
     
     # Show financial summary if there were successful queries
     if successful_count > 0:
@@ -1308,7 +1983,8 @@ def print_processing_summary(results: List[Dict], successful_count: int, output_
     # Show error categories
     if error_categories:
         print(f"\n🔍 Error Categories:")
-        for category, count in sorted(error_categories.items(), key=lambda x: x[1], reverse=True):
+        # Ties by name, so the listing doesn't depend on the order results arrived in
+        for category, count in sorted(error_categories.items(), key=lambda item: (-item[1], item[0])):
             percentage = (count / total_count) * 100
             print(f"  • {category}: {count} ({percentage:.1f}%)")
     
@@ -1349,7 +2025,9 @@ def test_api_connection(config=None, api_client=None):
         print(f"Base URL: {api.config.base_url}")
         print(f"Client ID: {api.config.client_id[:8]}***")
     
-    if api.authenticate():
+    # A fresh client is what's being tested, so it always authenticates; a passed one keeps a valid token
+    authenticated = api.authenticate() if api_client is None else api.authenticate_if_needed()
+    if authenticated:
         print("✅ Authentication successful!")
         print(f"Token expires in: {int(api.token_expires_at - time.time())} seconds")
         
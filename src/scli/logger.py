@@ -123,6 +123,10 @@ def set_debug_mode():
 def log_request(logger: logging.Logger, method: str, url: str, headers: dict = None, 
                data: any = None, response_status: int = None, response_text: str = None):
     """Log HTTP request details for debugging"""
+    # Everything below is DEBUG output; skip building it when nothing would be emitted
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    
     logger.debug(f"HTTP {method} Request:")
     logger.debug(f"  URL: {url}")
     
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the COBOL processor script
+"""
+
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+SCRIPT_PATH = Path(__file__).parent / 'scripts' / 'cobol_processor.py'
+
+
+@pytest.fixture(scope='module')
+def processor():
+    """Load the script the same way the CLI does, by path"""
+    spec = importlib.util.spec_from_file_location('cobol_processor', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_browse_listing_shows_file_rewritten_in_place(tmp_path, monkeypatch, processor):
+    data_file = tmp_path / 'data.txt'
+    data_file.write_text('x' * 10)
+    dir_stat = os.stat(tmp_path)
+    first, _ = processor._get_browse_listing(str(tmp_path), '.txt').page(10)
+
+    # Same name, same directory mtime: only the file itself changed
+    data_file.write_text('x' * 5000)
+    os.utime(tmp_path, ns=(dir_stat.st_atime_ns, dir_stat.st_mtime_ns))
+    second, _ = processor._get_browse_listing(str(tmp_path), '.txt').page(10)
+
+    assert first[0]['description'] != second[0]['description']
+    assert 'stat' not in second[0]
+
+    monkeypatch.setattr(processor, 'interactive_menu', lambda title, items: second[0])
+    path, file_stat = processor._browse_for_file_with_stat('.txt', 'Select', str(tmp_path))
+    assert path == str(data_file)
+    assert file_stat.st_size == 5000
+
+
+def test_browse_session_shuts_down_stat_pool(tmp_path, monkeypatch, processor):
+    for i in range(5):
+        (tmp_path / f'data{i}.txt').write_text('x' * i)
+    monkeypatch.setattr(processor, '_PARALLEL_STAT_THRESHOLD', 2)
+    pools = []
+
+    def pick_first_file(title, items):
+        pools.append(processor._STAT_POOL)
+        return next(item for item in items if item['type'] == 'file')
+
+    monkeypatch.setattr(processor, 'interactive_menu', pick_first_file)
+    path, _ = processor._browse_for_file_with_stat('.txt', 'Select', str(tmp_path))
+
+    assert path == str(tmp_path / 'data0.txt')
+    assert pools[0] is not None
+    assert pools[0]._shutdown
+    assert processor._STAT_POOL is None
+
+
+def test_directory_scan_pruning_rules(tmp_path, processor):
+    root = tmp_path / 'root'
+    outside = tmp_path / 'outside'
+    for directory in ('src/nested', '.hidden', '.git', 'build', 'dist', 'target', 'node_modules'):
+        (root / directory).mkdir(parents=True)
+        (root / directory / 'record.cpy').write_text('')
+        (root / directory / 'data.TXT').write_text('')
+    outside.mkdir()
+    (outside / 'linked.cpy').write_text('')
+    (root / 'top.txt').write_text('')
+    (root / 'notes.md').write_text('')
+    # Links to directories are never followed, and one named *.txt is not a file
+    os.symlink(outside, root / 'linked_dir')
+    os.symlink(outside, root / 'looks_like.txt')
+
+    cpy_files, txt_files = processor.scan_directory_for_files(str(root))
+
+    assert cpy_files == [str(root / 'src' / 'nested' / 'record.cpy')]
+    assert txt_files == [str(root / 'src' / 'nested' / 'data.TXT'), str(root / 'top.txt')]
+
+
+def test_directory_scan_reports_unreadable_directory(tmp_path, capsys, processor):
+    cpy_files, txt_files = processor.scan_directory_for_files(str(tmp_path / 'missing'))
+
+    assert (cpy_files, txt_files) == ([], [])
+    assert 'Error scanning directory' in capsys.readouterr().out
+
+
+MULTI_TYPE_COPYBOOK = """\
+      * Collection file: header, details and a total record
+       01  RECAUDACION.
+           02  UGEC-CAB-RECAUDAC.
+               05  CAB-TIPO        PIC X.
+               05  CAB-FECHA       PIC 9(8).
+               05  CAB-GLOSA       PIC X(11).
+           02  UGEC-DET-RECAUDAC REDEFINES UGEC-CAB-RECAUDAC.
+               05  DET-TIPO        PIC X.
+               05  DET-CREDITO     PIC 9(10).
+               05  DET-MONTO       PIC 9(5)V99.
+               05  DET-INTERES     PIC 9(3)V9(2) COMP-3.
+           02  UGEC-TOT-RECAUDAC REDEFINES UGEC-CAB-RECAUDAC.
+               05  TOT-TIPO        PIC X.
+               05  TOT-REGISTROS   PIC 9(6).
+               05  TOT-MONTO       PIC 9(9)V99.
+"""
+
+SINGLE_TYPE_COPYBOOK = """\
+       01  CLIENTE.
+           05  RUT             PIC 9(8).
+           05  NOMBRE          PIC X(20).
+           05  SALDO           PIC 9(7)V99.
+"""
+
+
+def export_csv(processor, monkeypatch, tmp_path, copybook_text, data, name):
+    """Run the interactive CSV export on `data` and return the CSV text"""
+    cpy_file = tmp_path / 'layout.cpy'
+    txt_file = tmp_path / 'data.txt'
+    cpy_file.write_text(copybook_text)
+    txt_file.write_bytes(data)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(processor, 'text_input',
+                        lambda prompt, default=None: ';' if 'separator' in prompt else name)
+
+    copybook = processor.parse_cobol_copybook(str(cpy_file))
+    parsed = processor.parse_data_file(str(txt_file), copybook)
+    processor.export_to_csv(parsed, copybook, str(txt_file))
+    return (tmp_path / 'output' / 'cobol_processor' / name).read_text(encoding='utf-8')
+
+
+def export_both_ways(processor, monkeypatch, tmp_path, copybook_text, data):
+    """CSV text from the NumPy batch exporter and from the line-by-line fallback"""
+    batch_calls = []
+    batch_parse = processor._batch_parse_fixed_width
+
+    def spy(*args):
+        batches = batch_parse(*args)
+        batch_calls.append(batches is not None)
+        return batches
+
+    with monkeypatch.context() as patch:
+        patch.setattr(processor, '_batch_parse_fixed_width', spy)
+        batch_csv = export_csv(processor, patch, tmp_path, copybook_text, data, 'batch.csv')
+    with monkeypatch.context() as patch:
+        patch.setattr(processor, '_batch_parse_fixed_width', lambda *args: None)
+        streamed_csv = export_csv(processor, patch, tmp_path, copybook_text, data, 'streamed.csv')
+    return batch_csv, streamed_csv, batch_calls
+
+
+def test_batch_export_matches_streaming_for_multiple_record_types(tmp_path, monkeypatch, processor):
+    lines = [
+        '120240131RECAUDACION',
+        '20000012345001234500150',
+        '20000012346   1 00  150',
+        '',
+        '20000012347999999912345',
+        '900000300000024690',
+    ]
+    # Uniform width, a whitespace-only line, and a last record without a newline
+    data = '\n'.join(line.ljust(23) for line in lines).encode('ascii')
+
+    batch_csv, streamed_csv, batch_calls = export_both_ways(processor, monkeypatch, tmp_path,
+                                                            MULTI_TYPE_COPYBOOK, data)
+
+    assert batch_calls == [True]
+    assert batch_csv == streamed_csv
+    rows = batch_csv.splitlines()
+    assert rows[0].split(';')[:4] == ['RECORD_TYPE', 'RECORD_NUMBER', 'CAB-TIPO', 'CAB-FECHA']
+    assert len(rows) == 6
+    assert 'UGEC-DET-RECAUDAC;2;' in rows[2] and '123.45;1.50' in rows[2]
+    assert '0000012346;1.00;1.50' in rows[3]
+    assert rows[-1].startswith('UGEC-TOT-RECAUDAC;6;')
+    assert rows[-1].endswith(';000003;246.90')
+
+
+def test_batch_export_matches_streaming_for_short_lines(tmp_path, monkeypatch, processor):
+    # Every line stops inside NOMBRE, so it is clipped and SALDO starts past the end
+    data = b'12345678ANA PER\n87654321LUIS  S\n'
+
+    batch_csv, streamed_csv, batch_calls = export_both_ways(processor, monkeypatch, tmp_path,
+                                                            SINGLE_TYPE_COPYBOOK, data)
+
+    assert batch_calls == [True]
+    assert batch_csv == streamed_csv
+    assert batch_csv.splitlines()[1:] == ['CLIENTE;1;12345678;ANA PER;', 'CLIENTE;2;87654321;LUIS  S;']
+
+
+def test_ragged_lines_fall_back_to_streaming_export(tmp_path, monkeypatch, processor):
+    data = b'12345678ANA PEREZ           000012345\n87654321LUIS\n\n11111111\r\n'
+
+    batch_csv, streamed_csv, batch_calls = export_both_ways(processor, monkeypatch, tmp_path,
+                                                            SINGLE_TYPE_COPYBOOK, data)
+
+    assert batch_calls == [False]
+    assert batch_csv == streamed_csv
+    assert batch_csv.splitlines()[1:] == [
+        'CLIENTE;1;12345678;ANA PEREZ;123.45',
+        'CLIENTE;2;87654321;LUIS;',
+        'CLIENTE;4;11111111;;',
+    ]
+
+
+@pytest.mark.parametrize('picture, length, field_type, decimals', [
+    ('X', 1, 'alphanumeric', 0),
+    ('XXX', 3, 'alphanumeric', 0),
+    ('X(30)', 30, 'alphanumeric', 0),
+    ('PIC X(3)', 3, 'alphanumeric', 0),
+    ('9(10)', 10, 'numeric', 0),
+    ('9(5)V9(2)', 7, 'numeric', 2),
+    ('9(3)V99', 5, 'numeric', 2),
+    ('999V99', 5, 'numeric', 2),
+    ('999V9(2)', 5, 'numeric', 2),
+    ('S9(5)', 5, 'numeric', 0),
+    ('S9(7)V99', 9, 'numeric', 2),
+    # Usage clauses don't change the length: exports carry packed fields as display digits
+    ('9(5)V99 COMP-3', 7, 'numeric', 2),
+    ('S9(9) COMP-3', 9, 'numeric', 0),
+])
+def test_picture_clause_lengths(processor, picture, length, field_type, decimals):
+    assert processor.parse_picture_clause(picture) == (length, field_type)
+    assert processor._decimal_places(picture) == decimals
+
+
+def test_field_offsets_follow_picture_lengths(tmp_path, monkeypatch, processor):
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    cpy_file = tmp_path / 'layout.cpy'
+    cpy_file.write_text(
+        '       01  PAGO.\n'
+        '           05  MONTO     PIC 999V99.\n'
+        '           05  TASA      PIC 9(2)V9(3).\n'
+        '           05  GLOSA     PIC X(4).\n'
+    )
+
+    fields = processor.parse_cobol_copybook(str(cpy_file)).elementary_fields
+
+    assert [(field.name, field.start_pos, field.length) for field in fields] == [
+        ('MONTO', 1, 5), ('TASA', 6, 5), ('GLOSA', 11, 4)
+    ]
+
+
+def parse_counting_reads(processor, monkeypatch, cpy_file):
+    """Parse a copybook, returning its fields and whether the file itself was parsed"""
+    reads = []
+    read_fields = processor._read_copybook_fields
+    monkeypatch.setattr(processor, '_read_copybook_fields',
+                        lambda path: reads.append(path) or read_fields(path))
+    fields = processor.parse_cobol_copybook(str(cpy_file)).elementary_fields
+    return [(field.name, field.start_pos, field.length) for field in fields], bool(reads)
+
+
+def test_copybook_cache_is_json_and_invalidated_by_content_and_version(tmp_path, monkeypatch, processor):
+    cache_dir = tmp_path / 'copybooks'
+    monkeypatch.setenv('SCLI_COPYBOOK_CACHE_DIR', str(cache_dir))
+    cpy_file = tmp_path / 'layout.cpy'
+    cpy_file.write_text('       01  PAGO.\n           05  MONTO     PIC 9(5).\n')
+
+    assert parse_counting_reads(processor, monkeypatch, cpy_file) == ([('MONTO', 1, 5)], True)
+    assert parse_counting_reads(processor, monkeypatch, cpy_file) == ([('MONTO', 1, 5)], False)
+    cache_files = list(cache_dir.iterdir())
+    assert len(cache_files) == 1 and cache_files[0].suffix == '.json'
+    assert json.loads(cache_files[0].read_text())['fields'][1][1] == 'MONTO'
+
+    cpy_file.write_text('       01  PAGO.\n           05  MONTO     PIC 9(12).\n')
+    assert parse_counting_reads(processor, monkeypatch, cpy_file) == ([('MONTO', 1, 12)], True)
+
+    monkeypatch.setattr(processor, '_COPYBOOK_CACHE_VERSION', processor._COPYBOOK_CACHE_VERSION + 1)
+    assert parse_counting_reads(processor, monkeypatch, cpy_file) == ([('MONTO', 1, 12)], True)
+    assert parse_counting_reads(processor, monkeypatch, cpy_file) == ([('MONTO', 1, 12)], False)
+
+
+def test_copybook_cache_can_be_turned_off(tmp_path, monkeypatch, processor):
+    monkeypatch.setenv('SCLI_COPYBOOK_CACHE_DIR', '')
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    cpy_file = tmp_path / 'layout.cpy'
+    cpy_file.write_text('       01  PAGO.\n           05  MONTO     PIC 9(5).\n')
+
+    assert parse_counting_reads(processor, monkeypatch, cpy_file) == ([('MONTO', 1, 5)], True)
+    assert parse_counting_reads(processor, monkeypatch, cpy_file) == ([('MONTO', 1, 5)], True)
+    assert not (tmp_path / 'cache').exists()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the consumer debt checker script
+"""
+
+import csv
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+SCRIPT_PATH = Path(__file__).parent / 'scripts' / 'consumer_debt_checker.py'
+
+
+@pytest.fixture(scope='module')
+def checker():
+    """Load the script the same way the CLI does, by path"""
+    spec = importlib.util.spec_from_file_location('consumer_debt_checker', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def select_column(monkeypatch, checker, column):
+    """Answer the column menu with `column`"""
+    monkeypatch.setattr(checker, 'interactive_menu',
+                        lambda title, options: next(o for o in options if o['value'] == column))
+
+
+def test_selection_keeps_columns_with_trailing_delimiter(tmp_path, monkeypatch, checker):
+    csv_file = tmp_path / 'trailing.csv'
+    csv_file.write_text('rut;credito;monto\n11;123456789012;5;\n12;223456789012;6\n13;323456789012;7\n')
+    select_column(monkeypatch, checker, 'credito')
+
+    credits, original_data, column = checker.extract_credit_numbers_from_csv_with_selection(str(csv_file))
+
+    assert credits == ['123456789012', '223456789012', '323456789012']
+    assert column == 'credito'
+    assert original_data[0] == {'rut': '11', 'credito': '123456789012', 'monto': '5'}
+
+
+def test_selection_duplicate_header_keeps_last_value(tmp_path, monkeypatch, checker):
+    csv_file = tmp_path / 'duplicate.csv'
+    csv_file.write_text('rut;credito;credito\n11;123456789012;999999999999\n')
+    select_column(monkeypatch, checker, 'credito')
+
+    credits, original_data, _ = checker.extract_credit_numbers_from_csv_with_selection(str(csv_file))
+
+    assert credits == ['999999999999']
+    assert original_data == [{'rut': '11', 'credito': '999999999999'}]
+
+
+def test_headed_extraction_with_trailing_delimiter(tmp_path, checker):
+    csv_file = tmp_path / 'headed.csv'
+    csv_file.write_text(
+        'RECORD_TYPE;NAME;UGEC-DET-IDENT01\n'
+        'UGEC-DET-RECAUDAC;a;1234567890123;\n'
+        'UGEC-DET-RECAUDAC;b;2234567890123\n'
+        'UGEC-DET-RECAUDAC;c;3234567890123;x;y\n'
+        'OTHER;d;4234567890123\n'
+    )
+
+    assert checker.extract_credit_numbers_from_csv(str(csv_file)) == [
+        '1234567890123', '2234567890123', '3234567890123'
+    ]
+
+
+def test_batches_share_limiter_and_back_off_on_503(monkeypatch, checker):
+    api = checker.ConsumerAPI.__new__(checker.ConsumerAPI)
+    calls = []
+
+    def query_debts(batch, concurrency, delay, limiter=None, bucket=None):
+        calls.append((len(batch), limiter))
+        for credit_number in batch:
+            yield {'credit_number': credit_number, 'status_code': 503 if credit_number == '0' else 200}
+
+    monkeypatch.setattr(api, 'query_debts', query_debts, raising=False)
+    monkeypatch.setattr(checker.time, 'sleep', lambda seconds: None)
+
+    results = list(api.query_debt_batches([str(i) for i in range(16)], batch_size=8))
+
+    assert len(results) == 16
+    assert [size for size, _ in calls] == [8, 4, 4]
+    assert len({id(limiter) for _, limiter in calls}) == 1
+    assert calls[0][1] is not None
+
+
+@pytest.mark.parametrize('amount_str, expected', [
+    ('', 0.0),
+    ('0', 0.0),
+    ('1234500', 123.45),
+    ('00010000', 1.0),
+    ('-10000', 0.0),
+    ('+10000', 0.0),
+    (' 10000', 0.0),
+    ('10000\n', 0.0),
+    ('1_0000', 0.0),
+    ('10000.5', 0.0),
+    ('١٠٠٠٠', 0.0),
+])
+def test_parse_amount_accepts_only_plain_digits(checker, amount_str, expected):
+    assert checker.ConsumerAPI.parse_amount(amount_str) == expected
+
+
+def test_growing_pool_closes_replaced_adapter(checker):
+    config = checker.ConsumerAPIConfig(base_url='http://127.0.0.1:9', auth_path='/token', debt_path='/loans',
+                                       client_id='client', client_secret='secret')
+    api = checker.ConsumerAPI(config)
+    first = api.session.adapters[api.config.base_url]
+    closed = []
+    first.close = lambda: closed.append(first)
+
+    api._ensure_pool_size(checker._DEFAULT_POOL_SIZE * 2)
+
+    assert closed == [first]
+    assert api.session.adapters[api.config.base_url] is not first
+
+
+def test_throttled_worker_sleeps_after_releasing_its_slot(monkeypatch, checker):
+    api = checker.ConsumerAPI.__new__(checker.ConsumerAPI)
+    limiter = checker.AdaptiveLimiter(maximum=2, initial=2)
+    in_flight_while_sleeping = []
+    monkeypatch.setattr(api, 'ensure_authentication', lambda: True, raising=False)
+    monkeypatch.setattr(api, '_ensure_pool_size', lambda size: None, raising=False)
+    monkeypatch.setattr(api, 'query_debt', lambda credit_number: {
+        'credit_number': credit_number, 'status_code': 429, 'retry_after': 5.0, 'from_cache': False
+    }, raising=False)
+    monkeypatch.setattr(checker.time, 'sleep', lambda seconds: in_flight_while_sleeping.append(limiter.in_flight))
+
+    results = list(api.query_debts(['1'], concurrency=2, limiter=limiter))
+
+    assert [result['status_code'] for result in results] == [429]
+    assert in_flight_while_sleeping == [0]
+    assert limiter.limit == 1
+
+
+def test_transport_leaves_throttling_to_the_limiter(checker):
+    config = checker.ConsumerAPIConfig(base_url='http://127.0.0.1:9', auth_path='/token', debt_path='/loans',
+                                       client_id='client', client_secret='secret')
+    retry = checker.ConsumerAPI(config)._transport_retry()
+
+    assert not checker._THROTTLE_STATUSES & set(retry.status_forcelist)
+    assert retry.respect_retry_after_header is False
+    assert retry.backoff_max == checker._RETRY_BACKOFF_MAX
+
+
+@pytest.mark.parametrize('capacity', [1, 8])
+def test_token_bucket_paces_from_the_first_request(monkeypatch, checker, capacity):
+    clock = [100.0]
+    monkeypatch.setattr(checker.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(checker.time, 'sleep', lambda seconds: clock.__setitem__(0, clock[0] + seconds))
+    bucket = checker.TokenBucket(10.0, capacity)
+
+    starts = []
+    for _ in range(4):
+        bucket.acquire()
+        starts.append(clock[0])
+
+    assert starts == pytest.approx([100.0, 100.1, 100.2, 100.3])
+
+
+def test_token_is_not_written_to_disk_unless_asked(checker):
+    api_config = {'base_url': 'http://127.0.0.1:9', 'auth_path': '/token', 'debt_path': '/loans',
+                  'client_id': 'client', 'client_secret': 'secret'}
+
+    assert checker.ConsumerAPIConfig(**api_config).persist_token is False
+    assert checker.ConsumerAPIConfig.from_config({'api': api_config}).persist_token is False
+    assert checker.ConsumerAPIConfig.from_config(
+        {'api': api_config, 'cache': {'persist_token': True}}).persist_token is True
+
+
+def test_generate_results_csv_joins_original_rows(tmp_path, monkeypatch, checker):
+    config = checker.ConsumerAPIConfig(base_url='http://127.0.0.1:9', auth_path='/token', debt_path='/loans',
+                                       client_id='client', client_secret='secret')
+    api = checker.ConsumerAPI(config)
+    output_file = tmp_path / 'results.csv'
+    monkeypatch.setattr(checker, 'results_output_path', lambda: str(output_file))
+    results = [
+        {'credit_number': '420010086702', 'status_code': 404, 'error': 'not found', 'response': None,
+         'timestamp': 't', 'from_cache': False},
+        {'credit_number': '420010086701', 'status_code': 200, 'error': None, 'timestamp': 't', 'from_cache': False,
+         'response': {'listRestInstallmentsPayableResponse': [
+             {'totalAmountReceipt': '1500000', 'receipNumber': '7', 'receiptSettlementDate': '2024-01-31'}
+         ]}},
+    ]
+    original_data = [{'RUT': '1-9', 'CREDITO': '420010086701', 'SUCURSAL': 'A'},
+                     {'RUT': '2-7', 'CREDITO': '420010086702', 'SUCURSAL': 'B'}]
+
+    assert checker.generate_results_csv(results, api, original_data) == str(output_file)
+
+    rows = list(csv.DictReader(output_file.open(encoding='utf-8')))
+    assert [(row['http_code'], row['codigo'], row['rut'], row['SUCURSAL']) for row in rows] == [
+        ('200', '420010086701', '1-9', 'A'), ('404', '420010086702', '2-7', 'B')
+    ]
+    assert rows[0]['total_debt_clp'] == '150'
+
+
+def test_summary_keeps_its_error_categories(tmp_path, capsys, checker):
+    api = checker.ConsumerAPI.__new__(checker.ConsumerAPI)
+    output_file = tmp_path / 'results.csv'
+    output_file.write_text('')
+    errors = [
+        'NO SE PUDO VALIDAR OPERACION',
+        'Revisar situacion de prestamo',
+        'REVISAR SITUACION CONTABLE',
+        'La aplicacion se encuentra desactiva',
+        'Reintentar por contexto',
+        'Reintentar por contexto: NO SE PUDO VALIDAR OPERACION',
+        '401 Unauthorized',
+        'Invalid token',
+        'Bad gateway',
+    ]
+    results = [{'credit_number': str(i), 'status_code': 400, 'error': error} for i, error in enumerate(errors)]
+
+    checker.print_processing_summary(results, 0, str(output_file), api)
+
+    lines = capsys.readouterr().out.split('🔍 Error Categories:\n')[1].split('\n\n')[0].splitlines()
+    assert [line.split(' (')[0] for line in lines] == [
+        '  • NO_VALIDAR_OPERACION: 2',
+        '  • REVISAR_SITUACION: 2',
+        '  • UNKNOWN: 2',
+        '  • APLICACION_DESACTIVA: 1',
+        '  • REINTENTAR_CONTEXTO: 1',
+        '  • TOKEN_INVALIDO: 1',
+    ]